@@ -1,139 +1,306 @@
-from aiohttp import ClientSession
+from aiohttp import ClientSession, ClientConnectionError, ClientConnectorError
 from . import urls
 from codeforces import models
-from common.bot import exceptions as common_exceptions, entities as common_entities
-from bs4 import BeautifulSoup
+from common.bot import (
+    exceptions as common_exceptions, entities as common_entities, extractors, notifications, retries, sources
+)
+from common.bot.rate_limits import RateLimiter
+from common.bot.monitors import PipelineMonitor
+from common.bot.scheduling import Scheduler
 from django.db import IntegrityError
 from django.db.models import Q
-from django.core.management import BaseCommand
 from django.conf import settings
-from math import ceil
+from django.utils import timezone
+from datetime import timedelta
+from functools import partial
+from typing import Callable
+from concurrent.futures import Executor
+from time import monotonic
+from http import HTTPStatus
+from yarl import URL
+import asyncio
 
 
 class CFBot(common_entities.Bot):
+    CSRF_TOKEN = extractors.InputValue('csrf_token')
+    LOGOUT_LINK = extractors.LinkHref('Logout')
+    SUBMISSION_ID = extractors.ClassAttribute('view-source', 'submissionid')
+    SUBMIT_ACTION = extractors.InputValue('action')
+    FORM_ERROR = extractors.ClassAttribute('error', 'class')
     _logout_url: str | None
+    _csrf_token: str | None
+    _csrf_token_expiry: float
 
-    def __init__(self, account: models.CFBotAccount, session: ClientSession, command: BaseCommand):
-        super().__init__(account, session, command)
+    def __init__(self, account: models.CFBotAccount, session: ClientSession, executor: Executor | None = None,
+                 notifier: notifications.Notifier | None = None, rate_limiter: RateLimiter | None = None,
+                 pipeline_monitor: PipelineMonitor | None = None, scheduler: Scheduler | None = None,
+                 retry_policy: retries.RetryPolicy | None = None,
+                 circuit_breakers: retries.CircuitBreakers | None = None):
+        super().__init__(
+            account, session, executor, notifier, rate_limiter, pipeline_monitor, scheduler, retry_policy,
+            circuit_breakers
+        )
         self._logout_url = None
+        self._invalidate_csrf_token()
 
     async def login(self):
         await super().login()
-        self._check_page_load(response := await self._session.get(urls.LOGIN_URL))
-        response = await self._session.post(urls.LOGIN_URL, data={
-            'csrf_token': self._extract_csrf_token(await self._generate_soup(response)),
+        self._invalidate_csrf_token()
+        page = await self._extract(await self._request('GET', urls.LOGIN_URL), self.CSRF_TOKEN)
+        response = await self._request('POST', urls.LOGIN_URL, data={
+            'csrf_token': self._extract_csrf_token(page),
             'action': 'enter',
             'handleOrEmail': self._account.handle,
             'password': self._account.clear_password,
             'remember': 'on'
         })
-        self._check_page_load(response)
-        self._logout_url = urls.BASE_URL + self._check_authentication(await self._generate_soup(response))
+        self._logout_url = urls.BASE_URL + self._check_authentication(
+            page := await self._extract(response, self.LOGOUT_LINK, self.CSRF_TOKEN)
+        )
+        self._cache_csrf_token(page)
+        self._logged_in()
+        await self._store_session(logout_url=self._logout_url)
+
+    async def resume(self):
+        await super().resume()
+        if not (bot_session := await self._restore_session()) or not bot_session.logout_url:
+            return False
+        async with await self._request('GET', urls.CONTEST_SUBMIT_URL, allow_redirects=False) as response:
+            if response.status != 200:
+                self._session.cookie_jar.clear()
+                return False
+        self._logout_url = bot_session.logout_url
+        self._invalidate_csrf_token()
         self._logged_in()
+        return True
 
     async def logout(self):
         if self._status != CFBot.Status.READY:
             raise common_exceptions.InvalidBotStateException(CFBot.Status.READY, self._status)
-        self._check_page_load(await self._session.get(self._logout_url))
+        self._check_page_load(await self._request('GET', self._logout_url))
         await super().logout()
 
-    def _extract_csrf_token(self, soup: BeautifulSoup):
-        if csrf_token := soup.find('input', {'name': 'csrf_token'}):
-            return csrf_token['value']
-        raise common_exceptions.CSRFTokenNotFound(soup)
+    def _extract_csrf_token(self, page: extractors.Page):
+        if csrf_token := page[self.CSRF_TOKEN]:
+            return csrf_token
+        raise common_exceptions.CSRFTokenNotFound(page)
+
+    def _cache_csrf_token(self, page: extractors.Page):
+        if csrf_token := page[self.CSRF_TOKEN]:
+            self._csrf_token = csrf_token
+            self._csrf_token_expiry = monotonic() + settings.CODEFORCES_CSRF_TOKEN_TTL
+
+    def _invalidate_csrf_token(self):
+        self._csrf_token = None
+        self._csrf_token_expiry = 0.0
 
-    def _check_authentication(self, soup: BeautifulSoup):
-        if logout_link := soup.find('a', string='Logout'):
-            return logout_link['href']
+    def _check_authentication(self, page: extractors.Page):
+        if logout_link := page[self.LOGOUT_LINK]:
+            return logout_link
         raise common_exceptions.AuthenticationFailed(self._account)
 
-    @common_entities.Bot._retry_authentication
-    async def _load_submit_page(self, problem: models.Problem) -> tuple[str, BeautifulSoup]:
-        self._check_authentication(soup := await self._generate_soup(
-            await self._session.get(url := urls.generate_problem_set_submit_url(
-                problem.problem_set
-            ) if problem.problem_set else urls.CONTEST_SUBMIT_URL, max_redirects=1)
+    def _cached_csrf_token(self):
+        if self._csrf_token and self._csrf_token_expiry > monotonic():
+            return self._csrf_token
+        return None
+
+    async def _load_submit_page(self, problem: models.Problem) -> tuple[str, str]:
+        url = (urls.generate_problem_set_submit_url(problem.problem_set) if problem.problem_set
+               else urls.CONTEST_SUBMIT_URL)
+        if csrf_token := self._cached_csrf_token():
+            return url, csrf_token
+        self._check_authentication(page := await self._extract(
+            await self._request('GET', url, max_redirects=1), self.CSRF_TOKEN, self.LOGOUT_LINK
         ))
-        return url, soup
+        self._cache_csrf_token(page)
+        return url, self._extract_csrf_token(page)
+
+    async def _submit_code_page(self, url: str, csrf_token: str, submission: models.CFCodeSubmission):
+        async with sources.open_source(submission.file) as source_file:
+            data = {
+                'csrf_token': csrf_token,
+                'action': 'submitSolutionFormSubmitted',
+                'submittedProblemCode': f'{submission.problem.contest.id}{submission.problem.index}'
+                if submission.problem.contest else str(submission.problem.index),
+                'programTypeId': str(submission.programming_language.website_id),
+                'sourceFile': source_file
+            }
+            try:
+                async with self._submit_lock:
+                    response = await self._request(
+                        'POST', url + f'?csrf_token={csrf_token}', RateLimiter.PAGE, RateLimiter.SUBMIT,
+                        in_flight=submission.id, data=data
+                    )
+                    await response.read()
+            except ClientConnectorError:
+                raise
+            except (ClientConnectionError, asyncio.TimeoutError):
+                raise common_exceptions.SubmissionOutcomeUnknown(url)
+            if response.status >= 500 and response.status not in retries.REJECTED_STATUSES:
+                response.release()
+                raise common_exceptions.SubmissionOutcomeUnknown(url)
+            self._check_authentication(page := await self._extract(
+                response, self.LOGOUT_LINK, self.SUBMISSION_ID, self.CSRF_TOKEN, self.SUBMIT_ACTION, self.FORM_ERROR
+            ))
+        self._cache_csrf_token(page)
+        return page
+
+    async def _load_and_submit(self, submission: models.CFCodeSubmission):
+        with self._time('load_submit_page'):
+            url, csrf_token = await self._load_submit_page(submission.problem)
+        with self._time('submit_code_page'):
+            return await self._submit_code_page(url, csrf_token, submission)
+
+    def _check_submission(self, page: extractors.Page):
+        if page[self.SUBMISSION_ID]:
+            return True
+        if page[self.SUBMIT_ACTION] == 'submitSolutionFormSubmitted' or page[self.FORM_ERROR]:
+            return False
+        raise common_exceptions.SubmissionOutcomeUnknown(str(URL(str(page)).with_query(None)))
 
     @common_entities.Bot._retry_authentication
-    async def _submit_code_page(self, url: str, soup: BeautifulSoup, submission: models.CFCodeSubmission):
-        data = {
-            'csrf_token': (csrf_token := self._extract_csrf_token(soup)),
-            'action': 'submitSolutionFormSubmitted',
-            'submittedProblemCode': f'{submission.problem.contest.id}{submission.problem.index}'
-            if submission.problem.contest else str(submission.problem.index),
-            'programTypeId': str(submission.programming_language.website_id),
-            'sourceFile': submission.file.open()
-        }
-        self._check_authentication(
-            soup := await self._generate_soup(await self._session.post(url + f'?csrf_token={csrf_token}', data=data))
-        )
-        return soup
+    async def _load_and_submit_code_page(self, submission: models.CFCodeSubmission):
+        cached = self._cached_csrf_token() is not None
+        try:
+            page = await self._load_and_submit(submission)
+        except common_exceptions.PageLoadFailed as e:
+            if not cached or e.status != HTTPStatus.FORBIDDEN:
+                raise
+        else:
+            if self._check_submission(page) or not cached:
+                return page
+        self._invalidate_csrf_token()
+        self._logger.warning('CSRF Token Rejected!', extra={'submission': submission.id, 'stage': 'submit'})
+        self._check_submission(page := await self._load_and_submit(submission))
+        return page
+
+    async def _find_duplicate(self, submission: models.CFCodeSubmission):
+        if not submission.source_hash:
+            return None
+        return await models.CFCodeSubmission.objects.filter(
+            source_hash=submission.source_hash,
+            bot_account=self._account,
+            problem=submission.problem_id,
+            programming_language=submission.programming_language_id,
+            status__in=(models.CFCodeSubmission.Status.SUBMITTED, models.CFCodeSubmission.Status.RESULT_NOT_FOUND)
+        ).order_by('id').afirst()
 
     async def _submit_code(self, submission: models.CFCodeSubmission):
-        soup = await self._submit_code_page(*await self._load_submit_page(submission.problem), submission)
-        if submission_id := soup.find(class_='view-source'):
-            submission.submission_id = submission_id['submissionid']
+        if original := await self._find_duplicate(submission):
+            submission.status = models.CFCodeSubmission.Status.DUPLICATE
+            submission.original = original
+            await submission.asave(update_fields=('status', 'original'))
+            self._logger.warning(f'Submission Duplicate of "{original.id}".', extra={
+                'submission': submission.id, 'stage': 'submit'
+            })
+            return
+        try:
+            page = await self._load_and_submit_code_page(submission)
+        except common_exceptions.SubmissionOutcomeUnknown as e:
+            self._logger.warning(str(e), extra={'submission': submission.id, 'stage': 'submit'})
+            page = None
+        if page is not None and (submission_id := page[self.SUBMISSION_ID]):
+            submission.submission_id = submission_id
             submission.status = models.CFCodeSubmission.Status.SUBMITTED
+            submission.submission_datetime = timezone.now()
             try:
-                await submission.asave(update_fields=('status', 'submission_id'))
-                self._command.stdout.write(
-                    self._command.style.SUCCESS(f'{self._account}: Submission Completed: "{submission.id}".')
-                )
+                with self._time('save_submission'):
+                    await submission.asave(update_fields=('status', 'submission_id', 'submission_datetime'))
+                self._logger.info('Submission Completed.', extra={'submission': submission.id, 'stage': 'submit'})
                 return
             except IntegrityError:
                 submission.submission_id = None
+                submission.submission_datetime = None
         submission.status = models.CFCodeSubmission.Status.FAILED
         await submission.asave(update_fields=('status',))
-        self._command.stderr.write(
-            self._command.style.NOTICE(f'{self._account}: Submission Failed: "{submission.id}"!')
-        )
+        self._logger.warning('Submission Failed!', extra={'submission': submission.id, 'stage': 'submit'})
 
     def _get_submissions(self):
         return models.CFCodeSubmission.objects.filter(
-            bot_account=self._account, status=models.CFCodeSubmission.Status.IN_PROGRESS
+            bot_account=self._account, owner=self._owner, status=models.CFCodeSubmission.Status.IN_PROGRESS
         ).select_related('problem__contest', 'problem__problem_set', 'programming_language')
 
-    async def _get_submissions_result(self):
-        if not (submissions := {submission.submission_id: submission async for submission in
-                models.CFCodeSubmission.objects.filter(
-                    Q(verdict=models.CFCodeSubmission.Verdict.TESTING) | Q(verdict__isnull=True),
-                    status=models.CFCodeSubmission.Status.SUBMITTED
-                )}):
+    def _update_result(self, submission: models.CFCodeSubmission, result: dict):
+        submission.status = models.CFCodeSubmission.Status.SUBMITTED
+        if not (verdict := result.get('verdict')):
             return
-        self._command.stdout.write(self._command.style.SUCCESS(f'{self._account}: Getting submissions result.'))
-        current_offset = 1
-        current_tries = - (ceil(len(submissions) / settings.CODEFORCES_SEARCH_COUNT))
-        while submissions and current_tries <= settings.CODEFORCES_SEARCH_RETRY_COUNT:
-            if (response := await self._session.get(
-                urls.generate_user_status_url(self._account.handle, current_offset, settings.CODEFORCES_SEARCH_COUNT)
-            )).status != 200:
-                raise common_exceptions.PageLoadFailed(str(response.url))
+        submission.verdict = models.CFCodeSubmission.Verdict[verdict]
+        submission.passed_test_count = result['passedTestCount']
+        submission.test_set = models.CFCodeSubmission.TestSet[result['testset']]
+        submission.time_consumed = result['timeConsumedMillis']
+        submission.memory_consumed = result['memoryConsumedBytes']
+        submission.points = result.get('points')
+        if submission.verdict != models.CFCodeSubmission.Verdict.TESTING and submission.submission_datetime:
+            self._pipeline_monitor.record_verdict((timezone.now() - submission.submission_datetime).total_seconds())
+
+    async def _fetch_results(self, submissions: dict[int, models.CFCodeSubmission],
+                             generate_url: Callable[[int, int], str]):
+        oldest_submission_id = min(submissions)
+        updated_submissions = list()
+        count = min(len(submissions) + settings.CODEFORCES_SEARCH_COUNT, settings.CODEFORCES_SEARCH_MAX_COUNT)
+        for offset in range(1, settings.CODEFORCES_SEARCH_PAGE_LIMIT * count + 1, count):
+            if (response := await self._request('GET', generate_url(offset, count), RateLimiter.API)).status != 200:
+                raise common_exceptions.PageLoadFailed(str(response.url), response.status)
             if not (results := (await response.json())['result']):
                 break
             for result in results:
-                if not (submission := submissions.get(result['id'])):
-                    continue
-                if not (verdict := result.get('verdict')):
-                    del submissions[result['id']]
-                    continue
-                submission.verdict = models.CFCodeSubmission.Verdict[verdict]
-                submission.passed_test_count = result['passedTestCount']
-                submission.test_set = models.CFCodeSubmission.TestSet[result['testset']]
-                submission.time_consumed = result['timeConsumedMillis']
-                submission.memory_consumed = result['memoryConsumedBytes']
-                submission.points = result.get('points')
-                await submission.asave(update_fields=(
-                    'verdict', 'passed_test_count', 'test_set', 'time_consumed', 'memory_consumed', 'points'
-                ))
-                del submissions[result['id']]
-            current_offset += settings.CODEFORCES_SEARCH_COUNT
-            current_tries += 1
-        await models.CFCodeSubmission.objects.filter(submission_id__in=submissions.keys()).aupdate(
-            status=models.CFCodeSubmission.Status.RESULT_NOT_FOUND
-        )
-        self._command.stdout.write(self._command.style.SUCCESS(f'{self._account}: Received submissions result.'))
+                if submission := submissions.pop(result['id'], None):
+                    self._update_result(submission, result)
+                    updated_submissions.append(submission)
+            if not submissions or results[-1]['id'] <= oldest_submission_id:
+                break
+        return updated_submissions
+
+    def _get_outstanding_submissions(self, sweep: bool = False):
+        statuses = Q(status=models.CFCodeSubmission.Status.SUBMITTED)
+        if sweep:
+            statuses |= Q(
+                status=models.CFCodeSubmission.Status.RESULT_NOT_FOUND,
+                submission_datetime__gte=timezone.now() - timedelta(seconds=settings.BOT_RESULT_SWEEP_WINDOW)
+            )
+        return models.CFCodeSubmission.objects.filter(
+            statuses,
+            Q(verdict=models.CFCodeSubmission.Verdict.TESTING) | Q(verdict__isnull=True),
+            bot_account=self._account
+        ).select_related('problem')
+
+    async def _get_submissions_result(self, sweep: bool = False):
+        now = timezone.now()
+        submission_groups = dict()
+        async for submission in self._get_outstanding_submissions(sweep):
+            submission_groups.setdefault(submission.problem.contest_id, dict())[submission.submission_id] = submission
+        if not submission_groups:
+            return None
+        start = monotonic()
+        self._logger.info('Getting submissions result.', extra={'stage': 'results', 'sample': 'results'})
+        updated_submissions = list()
+        for contest_id, submission_group in submission_groups.items():
+            updated_submissions.extend(await self._fetch_results(submission_group, partial(
+                urls.generate_contest_status_url, contest_id, self._account.handle
+            ) if contest_id else partial(urls.generate_user_status_url, self._account.handle)))
+        submissions = {submission_id: submission for submission_group in submission_groups.values()
+                       for submission_id, submission in submission_group.items()}
+        expiry = now - timedelta(seconds=settings.BOT_RESULT_WINDOW)
+        with self._time('save_results'):
+            await models.CFCodeSubmission.objects.abulk_update(updated_submissions, (
+                'status', 'verdict', 'passed_test_count', 'test_set', 'time_consumed', 'memory_consumed', 'points'
+            ))
+            await models.CFCodeSubmission.objects.filter(
+                Q(submission_datetime__lt=expiry) | Q(submission_datetime__isnull=True),
+                bot_account=self._account,
+                status=models.CFCodeSubmission.Status.SUBMITTED,
+                submission_id__in=submissions.keys()
+            ).aupdate(status=models.CFCodeSubmission.Status.RESULT_NOT_FOUND)
+        self._logger.info('Received submissions result.', extra={
+            'stage': 'results', 'duration': round(monotonic() - start, 3), 'sample': 'results'
+        })
+        return min((self._result_poll_delay(submission.submission_datetime) for submission in (
+            *(submission for submission in updated_submissions
+              if submission.verdict in (None, models.CFCodeSubmission.Verdict.TESTING)),
+            *(submission for submission in submissions.values()
+              if submission.status == models.CFCodeSubmission.Status.SUBMITTED
+              and submission.submission_datetime and submission.submission_datetime >= expiry)
+        )), default=None)
 
 
 class CFManager(common_entities.Manager):
@@ -141,12 +308,12 @@ class CFManager(common_entities.Manager):
         return models.CFBotAccount.objects.filter(status=models.CFBotAccount.Status.ACTIVE)
 
     async def _run_bot(self, account: models.CFBotAccount):
-        async with ClientSession() as session:
-            async with CFBot(account, session, self._command) as bot:
-                try:
-                    await bot.run()
-                except common_exceptions.BotException as e:
-                    print(str(e))
+        async with self._transport.create_session() as session:
+            async with CFBot(
+                account, session, self._executor, self._notifier, self._rate_limiter, self._pipeline_monitor,
+                self._scheduler, self._retry_policy, self._circuit_breakers
+            ) as bot:
+                await bot.run()
 
     def _get_submissions(self):
         return models.CFCodeSubmission.objects
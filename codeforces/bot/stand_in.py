@@ -0,0 +1,218 @@
+from aiohttp import web
+from contextlib import contextmanager
+from itertools import count
+from random import Random
+from threading import Thread
+from time import monotonic, time
+from uuid import uuid4
+import asyncio
+import re
+
+SESSION_COOKIE = 'JSESSIONID'
+PROBLEM_CODE_PATTERN = re.compile(r'(\d+)([A-Za-z]\d*)')
+
+
+class StandInSubmission:
+    id: int
+    handle: str
+    contest_id: int | None
+    created: float
+    judged: float
+
+    def __init__(self, id: int, handle: str, contest_id: int | None, created: float, judged: float):
+        self.id = id
+        self.handle = handle
+        self.contest_id = contest_id
+        self.created = created
+        self.judged = judged
+
+    def result(self, now: float):
+        judged = now >= self.judged
+        return {
+            'id': self.id,
+            'contestId': self.contest_id,
+            'creationTimeSeconds': int(self.created),
+            'verdict': 'OK' if judged else 'TESTING',
+            'testset': 'TESTS',
+            'passedTestCount': 10 if judged else 0,
+            'timeConsumedMillis': 15 if judged else 0,
+            'memoryConsumedBytes': 1024 * 1024 if judged else 0
+        }
+
+
+class StandInServer:
+    host: str
+    port: int
+    latency: float
+    error_rate: float
+    retry_after: float
+    judge_delay: float
+    app: web.Application
+    requests: int
+    errors: int
+    _randomness: Random
+    _sessions: dict[str, str]
+    _csrf_tokens: dict[str, str]
+    _submissions: dict[str, list[StandInSubmission]]
+    _submission_ids: count
+    _runner: web.AppRunner | None
+
+    def __init__(self, host: str = 'localhost', port: int = 0, latency: float = 0.0, error_rate: float = 0.0,
+                 retry_after: float = 1.0, judge_delay: float = 1.0, seed: int | None = None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.judge_delay = judge_delay
+        self.requests = 0
+        self.errors = 0
+        self._randomness = Random(seed)
+        self._sessions = dict()
+        self._csrf_tokens = dict()
+        self._submissions = dict()
+        self._submission_ids = count(1)
+        self._runner = None
+        self.app = web.Application(middlewares=(self._simulate_network,))
+        self.app.add_routes((
+            web.get('/enter', self.login_page),
+            web.post('/enter', self.login),
+            web.get('/{token}/logout', self.logout),
+            web.get('/problemset/submit', self.submit_page),
+            web.post('/problemset/submit', self.submit),
+            web.get('/problemsets/{problem_set}/submit', self.submit_page),
+            web.post('/problemsets/{problem_set}/submit', self.submit),
+            web.get('/api/user.status', self.status),
+            web.get('/api/contest.status', self.status)
+        ))
+
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.port}'
+
+    @web.middleware
+    async def _simulate_network(self, request: web.Request, handler):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self._randomness.expovariate(1 / self.latency))
+        if self._randomness.random() < self.error_rate:
+            self.errors += 1
+            await request.read()
+            raise web.HTTPServiceUnavailable(headers={'Retry-After': f'{self.retry_after:g}'})
+        return await handler(request)
+
+    def _session(self, request: web.Request):
+        if (token := request.cookies.get(SESSION_COOKIE)) in self._sessions:
+            return token
+        return None
+
+    def _csrf_token(self, token: str):
+        if not (csrf_token := self._csrf_tokens.get(token)):
+            csrf_token = self._csrf_tokens[token] = uuid4().hex
+        return csrf_token
+
+    def _page(self, token: str | None, body: str = ''):
+        csrf_token = self._csrf_token(token or '')
+        logout = f'<a href="/{token}/logout">Logout</a>' if token else '<a href="/enter">Enter</a>'
+        return web.Response(text=(
+            f'<!DOCTYPE html><html><head><title>Codeforces</title></head><body><div class="lang-chooser">{logout}'
+            f'</div><form method="post"><input type="hidden" name="csrf_token" value="{csrf_token}"/></form>'
+            f'{body}</body></html>'
+        ), content_type='text/html')
+
+    async def login_page(self, request: web.Request):
+        return self._page(self._session(request))
+
+    async def login(self, request: web.Request):
+        form = await request.post()
+        if not form.get('handleOrEmail') or form.get('csrf_token') != self._csrf_token(self._session(request) or ''):
+            return self._page(None)
+        self._sessions[token := uuid4().hex] = form['handleOrEmail']
+        response = self._page(token)
+        response.set_cookie(SESSION_COOKIE, token, httponly=True)
+        return response
+
+    async def logout(self, request: web.Request):
+        self._sessions.pop(request.match_info['token'], None)
+        self._csrf_tokens.pop(request.match_info['token'], None)
+        response = web.HTTPFound('/enter')
+        response.del_cookie(SESSION_COOKIE)
+        raise response
+
+    def _submit_form(self, token: str, error: str = ''):
+        return self._page(token, (
+            f'<form class="submit-form" method="post"><input type="hidden" name="csrf_token" '
+            f'value="{self._csrf_token(token)}"/><input type="hidden" name="action" '
+            f'value="submitSolutionFormSubmitted"/>{error}</form>'
+        ))
+
+    async def submit_page(self, request: web.Request):
+        if not (token := self._session(request)):
+            raise web.HTTPFound('/enter')
+        return self._submit_form(token)
+
+    async def submit(self, request: web.Request):
+        if not (token := self._session(request)):
+            raise web.HTTPFound('/enter')
+        form = await request.post()
+        if form.get('csrf_token') != self._csrf_token(token) or not form.get('sourceFile'):
+            return self._submit_form(token, '<span class="error for__source">Invalid request.</span>')
+        problem_code = PROBLEM_CODE_PATTERN.fullmatch(form.get('submittedProblemCode', ''))
+        contest_id = int(problem_code[1]) if problem_code and 'problem_set' not in request.match_info else None
+        now = monotonic()
+        submission = StandInSubmission(
+            next(self._submission_ids), self._sessions[token], contest_id, time(),
+            now + (self._randomness.expovariate(1 / self.judge_delay) if self.judge_delay else 0.0)
+        )
+        self._submissions.setdefault(submission.handle, list()).append(submission)
+        if self.latency:
+            await asyncio.sleep(self._randomness.expovariate(1 / self.latency))
+        return self._page(token, ''.join(
+            f'<a class="view-source" submissionid="{submission.id}" href="#">{submission.id}</a>'
+            for submission in reversed(self._submissions[submission.handle][-10:])
+        ))
+
+    async def status(self, request: web.Request):
+        handle = request.query.get('handle')
+        contest_id = int(request.query['contestId']) if 'contestId' in request.query else None
+        offset, limit = int(request.query.get('from', 1)), int(request.query.get('count', 10))
+        now = monotonic()
+        submissions = [submission for submission in reversed(self._submissions.get(handle, ()))
+                       if contest_id is None or submission.contest_id == contest_id]
+        return web.json_response({'status': 'OK', 'result': [
+            submission.result(now) for submission in submissions[offset - 1:offset - 1 + limit]
+        ]})
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def close(self):
+        await self._runner.cleanup()
+        self._runner = None
+
+    @contextmanager
+    def run_in_thread(self):
+        event_loop = asyncio.new_event_loop()
+        thread = Thread(target=event_loop.run_forever, name='stand-in', daemon=True)
+        thread.start()
+        try:
+            asyncio.run_coroutine_threadsafe(self.start(), event_loop).result()
+            try:
+                yield self
+            finally:
+                asyncio.run_coroutine_threadsafe(self.close(), event_loop).result()
+        finally:
+            event_loop.call_soon_threadsafe(event_loop.stop)
+            thread.join()
+            event_loop.close()
+
+    def __str__(self):
+        return (f'Stand-In: {self.requests} requests, {self.errors} errors, '
+                f'{sum(map(len, self._submissions.values()))} submissions')
+
+
+__all__ = ('StandInSubmission', 'StandInServer')
@@ -1,21 +1,52 @@
+from django.conf import settings
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from codeforces.models import ProblemSet
 
-BASE_URL = 'https://codeforces.com'
-API_URL = f'{BASE_URL}/api'
-LOGIN_URL = f'{BASE_URL}/enter'
-PROBLEM_SET_URL = f'{BASE_URL}/problemset'
-CONTEST_SUBMIT_URL = f'{PROBLEM_SET_URL}/submit'
+PATHS = {
+    'API_URL': '/api',
+    'LOGIN_URL': '/enter',
+    'PROBLEM_SET_URL': '/problemset',
+    'CONTEST_SUBMIT_URL': '/problemset/submit',
+    'CONTEST_LIST_URL': '/api/contest.list',
+    'PROBLEM_SET_PROBLEMS_URL': '/api/problemset.problems'
+}
+
+
+def generate_url(path: str):
+    return settings.CODEFORCES_BASE_URL.rstrip('/') + path
+
+
+def __getattr__(name: str):
+    if name == 'BASE_URL':
+        return generate_url('')
+    if name in PATHS:
+        return generate_url(PATHS[name])
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 def generate_problem_set_submit_url(problem_set: 'ProblemSet'):
-    return f'{PROBLEM_SET_URL}s/{problem_set.short_name}/submit'
+    return generate_url(f'/problemsets/{problem_set.short_name}/submit')
 
 
 def generate_user_status_url(handle: str, offset: int, count: int):
-    return f'{API_URL}/user.status?handle={handle}&from={offset}&count={count}'
+    return generate_url(f'/api/user.status?handle={handle}&from={offset}&count={count}')
+
+
+def generate_contest_status_url(contest_id: int, handle: str, offset: int, count: int):
+    return generate_url(f'/api/contest.status?contestId={contest_id}&handle={handle}&from={offset}&count={count}')
 
 
-__all__ = ('BASE_URL', 'LOGIN_URL', 'PROBLEM_SET_URL', 'CONTEST_SUBMIT_URL', 'generate_problem_set_submit_url')
+__all__ = (
+    'BASE_URL',
+    'LOGIN_URL',
+    'PROBLEM_SET_URL',
+    'CONTEST_SUBMIT_URL',
+    'CONTEST_LIST_URL',
+    'PROBLEM_SET_PROBLEMS_URL',
+    'generate_url',
+    'generate_problem_set_submit_url',
+    'generate_user_status_url',
+    'generate_contest_status_url'
+)
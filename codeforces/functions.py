@@ -0,0 +1,50 @@
+from django.db import connection
+from . import models
+
+
+def seed_accounts(count: int, prefix: str = 'benchmark'):
+    return [models.CFBotAccount.objects.create(
+        handle=f'{prefix}-{index}', clear_password=f'{prefix}-password', email=f'{prefix}-{index}@example.com'
+    ) for index in range(count)]
+
+
+def seed_problem(prefix: str = 'benchmark'):
+    problem_set, _ = models.ProblemSet.objects.get_or_create(short_name=prefix, defaults={'name': prefix})
+    problem, _ = models.Problem.objects.get_or_create(problem_set=problem_set, index='A', defaults={
+        'name': prefix, 'type': models.Problem.Type.PROGRAMMING, 'rating': 800
+    })
+    programming_language, _ = models.ProgrammingLanguage.objects.get_or_create(website_id=0, defaults={
+        'name': prefix
+    })
+    return problem, programming_language
+
+
+def unseed_problem(prefix: str = 'benchmark'):
+    models.ProblemSet.objects.filter(short_name=prefix, name=prefix).exclude(
+        problems__submissions__isnull=False
+    ).delete()
+    models.ProgrammingLanguage.objects.filter(website_id=0, name=prefix, submissions__isnull=True).delete()
+
+
+def seed_submissions(count: int, problem: models.Problem, programming_language: models.ProgrammingLanguage,
+                     file: str = 'code-submissions/benchmark.cpp', batch_size: int = 1000, **fields):
+    parent = models.CFCodeSubmission._meta.pk.remote_field.model
+    child_columns = (models.CFCodeSubmission._meta.pk.column,
+                     models.CFCodeSubmission._meta.get_field('problem').column,
+                     models.CFCodeSubmission._meta.get_field('programming_language').column,
+                     models.CFCodeSubmission._meta.get_field('passed_test_count').column)
+    query = (f'INSERT INTO {connection.ops.quote_name(models.CFCodeSubmission._meta.db_table)} '
+             f'({", ".join(map(connection.ops.quote_name, child_columns))}) VALUES (%s, %s, %s, %s)')
+    submission_ids = list()
+    for offset in range(0, count, batch_size):
+        parents = parent.objects.bulk_create(
+            parent(file=file, **fields) for _ in range(offset, min(offset + batch_size, count))
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(query, [(submission.id, problem.id, programming_language.id, 0)
+                                       for submission in parents])
+        submission_ids.extend(submission.id for submission in parents)
+    return submission_ids
+
+
+__all__ = ('seed_accounts', 'seed_problem', 'unseed_problem', 'seed_submissions')
@@ -0,0 +1,444 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.test.utils import CaptureQueriesContext, override_settings
+from asgiref.sync import async_to_sync, sync_to_async
+from codeforces import models, functions
+from codeforces.bot.entities import CFBot, CFManager
+from codeforces.bot.stand_in import StandInServer
+from common.bot.entities import Bot
+from common import storages
+from common.bot import extractors, logs
+from common.bot.monitors import EventLoopLagMonitor
+from common.bot.scheduling import Scheduler, SchedulingPolicy, RoundRobinPolicy
+from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.utils.module_loading import import_string
+from concurrent.futures import Executor
+from io import StringIO
+from pathlib import Path
+from statistics import quantiles
+from time import perf_counter
+from math import ceil
+from random import Random
+import asyncio
+import heapq
+import re
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the Codeforces bot against seeded data, rolling the data back afterwards.'
+    COMMITTING_SCENARIOS = ('database', 'fleet')
+    SCAN_PATTERNS = {
+        'sqlite': re.compile(r'\bSCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?'),
+        'postgresql': re.compile(r'Seq Scan on (\w+)()')
+    }
+    PARITY_CASES = {
+        'commented token': b'<!-- <input name="csrf_token" value="old"> --><input type="hidden" name="csrf_token" '
+                           b'value="new"><a href="/logout">Logout</a>',
+        'only commented token': b'<!-- <input name="csrf_token" value="old"> --><a href="/logout">Logout</a>',
+        'nested link text': b'<a href="/logout"><span>Logout</span></a>',
+        'angle brackets in values': b'<a title="a > b" href="/logout">Logout</a><input title="x>y" '
+                                    b'name="csrf_token" value="v"><span class="view-source" title="1 > 0" '
+                                    b'submissionid="42">',
+        'unquoted values': b"<input name=csrf_token value=abc><tr class='highlighted-row view-source' "
+                           b"submissionid='7'>",
+        'decoys': b'<input name="csrf_token_old" value="no"><input name="csrf_token" value="yes">'
+                  b'<div class="view-sources" submissionid="1"></div><div class="view-source" submissionid="2">',
+        'entity in link text': b'<a href="/logout">Log&#111;ut</a>',
+        'rejected submit': b'<form class="submit-form"><input type="hidden" name="action" '
+                           b'value="submitSolutionFormSubmitted"/><span class="error for__source">Invalid</span>'
+                           b'</form>',
+        'nothing': b'<html><body><p>Codeforces is temporarily unavailable.</p></body></html>'
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=(
+            'assignment', 'extraction', 'offload', 'plans', 'database', 'scheduling', 'fleet'
+        ))
+        parser.add_argument('--accounts', type=int, default=20)
+        parser.add_argument('--submissions', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--pages', nargs='*', default=(), help='Saved Codeforces pages or directories of them.')
+        parser.add_argument('--extractor', default=settings.BOT_HTML_EXTRACTOR)
+        parser.add_argument('--duration', type=float, default=5.0)
+        parser.add_argument('--scan-threshold', type=int, default=1000,
+                            help='Sequential scans on tables smaller than this are allowed.')
+        parser.add_argument('--timeout', type=float, default=300.0)
+        parser.add_argument('--latency', type=float, default=0.05, help='Mean stand-in response latency in seconds.')
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help='Share of stand-in requests answered with 503.')
+        parser.add_argument('--judge-delay', type=float, default=2.0, help='Mean stand-in judging time in seconds.')
+        parser.add_argument('--no-rate-limits', action='store_true')
+        parser.add_argument('--restart-after', type=float, help='Restart the fleet manager every that many seconds.')
+        parser.add_argument('--allow-commit', action='store_true', help=(
+            'Allow the database and fleet scenarios to commit seeded accounts and submissions. Running managers '
+            'claim them like any other rows, so point DATABASE_NAME at a scratch database first.'
+        ))
+        parser.add_argument('--policies', nargs='*', default=(
+            'common.bot.scheduling.RoundRobinPolicy', 'common.bot.scheduling.LeastOutstandingWorkPolicy'
+        ))
+
+    def handle(self, *args, **options):
+        if options['scenario'] in self.COMMITTING_SCENARIOS:
+            if not options['allow_commit']:
+                raise CommandError(
+                    f'The {options["scenario"]} scenario commits ACTIVE accounts and PENDING submissions that running '
+                    f'managers would claim. Point DATABASE_NAME at a scratch database and pass --allow-commit.'
+                )
+            getattr(self, f'benchmark_{options["scenario"]}')(**options)
+            return
+        with transaction.atomic():
+            getattr(self, f'benchmark_{options["scenario"]}')(**options)
+            transaction.set_rollback(True)
+
+    async def _start_manager(self):
+        manager = CFManager(asyncio.get_running_loop())
+        for account in await sync_to_async(manager._claim_accounts)():
+            Bot.active_accounts[account.id] = account
+        return manager
+
+    async def _tick(self, manager: CFManager):
+        await manager._renew_leases()
+        await manager._assign_tasks()
+
+    def benchmark_assignment(self, accounts: int, submissions: int, repeat: int, **options):
+        account_ids = [account.id for account in functions.seed_accounts(accounts)]
+        submission_ids = functions.seed_submissions(submissions, *functions.seed_problem())
+        for run in range(1, repeat + 1):
+            models.CFBotAccount.objects.filter(id__in=account_ids).update(owner=None, heartbeat=None, lease_expiry=None)
+            models.CFCodeSubmission.objects.filter(id__in=submission_ids).update(
+                status=models.CFCodeSubmission.Status.PENDING, bot_account=None, owner=None, heartbeat=None,
+                lease_expiry=None
+            )
+            manager = async_to_sync(self._start_manager)()
+            manager._scheduler = Scheduler(RoundRobinPolicy())
+            try:
+                with CaptureQueriesContext(connection) as queries, override_settings(
+                    BOT_ASSIGNMENT_LIMIT_PER_ACCOUNT=ceil(submissions / accounts), BOT_SCHEDULER_MAX_OUTSTANDING=None
+                ):
+                    start = perf_counter()
+                    async_to_sync(self._tick)(manager)
+                    elapsed = perf_counter() - start
+            finally:
+                Bot.active_accounts.clear()
+            assigned = models.CFCodeSubmission.objects.filter(
+                id__in=submission_ids, status=models.CFCodeSubmission.Status.IN_PROGRESS
+            ).count()
+            self.stdout.write(self.style.SUCCESS(
+                f'Run {run}: {assigned}/{submissions} submissions over {accounts} accounts, '
+                f'{len(queries)} queries, {elapsed * 1000:.1f} ms.'
+            ))
+
+    def _load_pages(self, pages: list[str]):
+        if not (files := [file for path in map(Path, pages) for file in (
+            sorted(path.glob('*.htm*')) if path.is_dir() else (path,)
+        )]):
+            raise CommandError('No saved pages were given, use --pages.')
+        return files
+
+    def benchmark_extraction(self, pages: list[str], repeat: int, **options):
+        queries = (CFBot.CSRF_TOKEN, CFBot.LOGOUT_LINK, CFBot.SUBMISSION_ID, CFBot.SUBMIT_ACTION, CFBot.FORM_ERROR)
+        backends = (extractors.SoupExtractor(), extractors.StrainedSoupExtractor(), extractors.PatternExtractor())
+        for case, html in self.PARITY_CASES.items():
+            expected = backends[0].extract(html, queries)
+            for backend in backends[1:]:
+                if (result := backend.extract(html, queries)) != expected:
+                    self.stdout.write(self.style.ERROR(
+                        f'{case}: {type(backend).__name__}: mismatch {result} != {expected}.'
+                    ))
+        self.stdout.write(self.style.SUCCESS(f'Checked {len(self.PARITY_CASES)} parity cases.'))
+        for file in self._load_pages(pages) if pages else ():
+            html = file.read_bytes()
+            expected = backends[0].extract(html, queries)
+            for backend in backends:
+                start = perf_counter()
+                for _ in range(repeat):
+                    result = backend.extract(html, queries)
+                elapsed = (perf_counter() - start) / repeat
+                self.stdout.write((self.style.SUCCESS if result == expected else self.style.ERROR)(
+                    f'{file.name} ({len(html) // 1024} KiB): {type(backend).__name__}: {elapsed * 1000:.2f} ms, '
+                    f'{"matches" if result == expected else f"mismatch {result} != {expected}"}.'
+                ))
+
+    async def _offload(self, extractor: extractors.Extractor, executor: Executor | None, pages: list[bytes]):
+        lag_monitor = EventLoopLagMonitor(0.01)
+        lag_monitor_task = asyncio.create_task(lag_monitor.run())
+        await asyncio.sleep(0.05)
+        start = perf_counter()
+        await asyncio.gather(*(extractors.extract(
+            extractor, executor, html, (CFBot.CSRF_TOKEN, CFBot.LOGOUT_LINK, CFBot.SUBMISSION_ID)
+        ) for html in pages))
+        elapsed = perf_counter() - start
+        await asyncio.sleep(0.05)
+        lag_monitor_task.cancel()
+        return elapsed, lag_monitor
+
+    def benchmark_offload(self, pages: list[str], repeat: int, extractor: str, **options):
+        html_pages = [file.read_bytes() for file in self._load_pages(pages)] * repeat
+        for mode in (None, 'thread', 'process'):
+            executor = extractors.create_executor(mode)
+            try:
+                elapsed, lag_monitor = asyncio.run(self._offload(import_string(extractor)(), executor, html_pages))
+            finally:
+                if executor:
+                    executor.shutdown()
+            self.stdout.write(self.style.SUCCESS(
+                f'{mode or "inline"}: {len(html_pages)} pages in {elapsed * 1000:.1f} ms, {lag_monitor}.'
+            ))
+
+    def _seed_history(self, account_ids: list[int], submission_ids: list[int]):
+        active_count = len(submission_ids) // 100
+        models.CFCodeSubmission.objects.filter(id__in=submission_ids[active_count:2 * active_count]).update(
+            status=models.CFCodeSubmission.Status.IN_PROGRESS, bot_account=account_ids[0]
+        )
+        history = submission_ids[2 * active_count:]
+        for index in range(0, len(history), settings.BOT_ASSIGNMENT_BATCH_SIZE):
+            chunk = history[index:index + settings.BOT_ASSIGNMENT_BATCH_SIZE]
+            models.CFCodeSubmission.objects.filter(id__in=chunk).update(
+                status=models.CFCodeSubmission.Status.SUBMITTED, bot_account=account_ids[index % len(account_ids)],
+                submission_id=F('id'), verdict=models.CFCodeSubmission.Verdict.OK, time_consumed=0,
+                memory_consumed=0
+            )
+
+    def _find_scans(self, plan: str, scan_threshold: int):
+        partial_indexes = {
+            index.name for model in apps.get_models() for index in model._meta.indexes if index.condition
+        }
+        with connection.cursor() as cursor:
+            for table, index in set(self.SCAN_PATTERNS[connection.vendor].findall(plan)):
+                if index in partial_indexes:
+                    continue
+                cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+                if (count := cursor.fetchone()[0]) >= scan_threshold:
+                    yield table, count
+
+    def benchmark_plans(self, accounts: int, submissions: int, scan_threshold: int, **options):
+        if connection.vendor not in self.SCAN_PATTERNS:
+            raise CommandError(f'Query plans are not supported on "{connection.vendor}"!')
+        account_ids = [account.id for account in functions.seed_accounts(accounts)]
+        self._seed_history(account_ids, functions.seed_submissions(submissions, *functions.seed_problem()))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        manager = CFManager(None)
+        account = models.CFBotAccount.objects.get(id=account_ids[0])
+        bot = CFBot(account, None)
+        Bot.active_accounts[account.id] = account
+        try:
+            queries = {
+                'Active Accounts': manager._get_active_accounts(),
+                'Leased Submissions': manager._get_leased_submissions(),
+                'Pending Submissions': manager._get_pending_submissions().order_by('id').values_list(
+                    'pk', flat=True
+                )[:settings.BOT_ASSIGNMENT_BATCH_SIZE],
+                'Stale Submissions': manager._get_stale_submissions(),
+                'Bot Submissions': bot._get_submissions(),
+                'Outstanding Submissions': bot._get_outstanding_submissions(sweep=True)
+            }
+            failures = 0
+            for name, queryset in queries.items():
+                plan = queryset.explain()
+                if scans := list(self._find_scans(plan, scan_threshold)):
+                    failures += 1
+                    self.stdout.write(self.style.ERROR(f'{name}: sequential scan on ' + ', '.join(
+                        f'"{table}" ({count} rows)' for table, count in scans
+                    ) + f'!\n{plan}'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'{name}: indexed.'))
+        finally:
+            Bot.active_accounts.clear()
+        if failures:
+            raise CommandError(f'{failures} of {len(queries)} hot queries fall back to a sequential scan!')
+
+    async def _run_bot_loop(self, bot: CFBot, deadline: float):
+        operations = 0
+        outstanding_submissions = list()
+        while perf_counter() < deadline:
+            submissions = [submission async for submission in bot._get_submissions()[:settings.BOT_SUBMIT_QUEUE_SIZE]]
+            await models.CFCodeSubmission.objects.filter(
+                id__in=[submission.id for submission in submissions]
+            ).aupdate(heartbeat=timezone.now())
+            await bot._check_account()
+            outstanding_submissions[:] = [submission async for submission in bot._get_outstanding_submissions()]
+            await models.CFBotAccount.objects.filter(id=bot._account.id).aupdate(heartbeat=timezone.now())
+            operations += 5
+        return operations
+
+    async def _run_bot_loops(self, bots: list[CFBot], duration: float):
+        start = perf_counter()
+        operations = sum(await asyncio.gather(*(self._run_bot_loop(bot, start + duration) for bot in bots)))
+        return operations, perf_counter() - start
+
+    def benchmark_database(self, accounts: int, submissions: int, duration: float, **options):
+        account_ids = [account.id for account in functions.seed_accounts(accounts)]
+        submission_ids = functions.seed_submissions(submissions, *functions.seed_problem())
+        try:
+            self._seed_history(account_ids, submission_ids)
+            models.CFCodeSubmission.objects.filter(
+                bot_account__in=account_ids, status=models.CFCodeSubmission.Status.IN_PROGRESS
+            ).update(owner='benchmark')
+            models.CFBotAccount.objects.filter(id__in=account_ids).update(owner='benchmark')
+            for concurrency in sorted({1, accounts}):
+                bots = [CFBot(account, None) for account in models.CFBotAccount.objects.filter(
+                    id__in=account_ids[:concurrency]
+                )]
+                operations, elapsed = async_to_sync(self._run_bot_loops)(bots, duration)
+                self.stdout.write(self.style.SUCCESS(
+                    f'{connection.vendor} ({connection.settings_dict["CONN_MAX_AGE"]} s connection age), '
+                    f'{concurrency} bots: {operations} operations in {elapsed:.1f} s, '
+                    f'{operations / elapsed:.0f} operations per second.'
+                ))
+        finally:
+            for index in range(0, len(submission_ids), settings.BOT_ASSIGNMENT_BATCH_SIZE):
+                models.CFCodeSubmission.objects.filter(
+                    id__in=submission_ids[index:index + settings.BOT_ASSIGNMENT_BATCH_SIZE]
+                ).delete()
+            models.CFBotAccount.objects.filter(id__in=account_ids).delete()
+            functions.unseed_problem()
+
+    def _simulate(self, policy: SchedulingPolicy, accounts: list[models.CFBotAccount], profiles: dict[int, tuple],
+                  submissions: int, seed: int):
+        randomness = Random(seed)
+        scheduler = Scheduler(policy)
+        start = timezone.now()
+        pending = list(range(submissions))
+        workers = {account.id: [0.0] * settings.BOT_SUBMIT_CONCURRENCY for account in accounts}
+        completions, failed, makespan, now = list(), 0, 0.0, 0.0
+        while pending:
+            while completions and completions[0][0] <= now:
+                _, account_id, latency, succeeded = heapq.heappop(completions)
+                scheduler.record_submission(account_id, latency, succeeded)
+            plan = scheduler.plan(pending[:scheduler.capacity(accounts)], accounts)
+            scheduler.assigned(plan)
+            for account in accounts:
+                if account.id in plan:
+                    account.last_assignment = start + timedelta(seconds=now)
+            for account_id, submission_ids in plan.items():
+                latency, error_rate = profiles[account_id]
+                for _ in submission_ids:
+                    submitted = max(now, heapq.heappop(workers[account_id]))
+                    finish = submitted + randomness.expovariate(1 / latency)
+                    heapq.heappush(workers[account_id], finish)
+                    heapq.heappush(completions, (
+                        finish, account_id, finish - submitted, succeeded := randomness.random() >= error_rate
+                    ))
+                    failed += not succeeded
+                    makespan = max(makespan, finish)
+            assigned = {submission_id for submission_ids in plan.values() for submission_id in submission_ids}
+            pending = [submission_id for submission_id in pending if submission_id not in assigned]
+            now += settings.BOT_POLL_INTERVAL
+        return makespan, failed
+
+    def benchmark_scheduling(self, accounts: int, submissions: int, repeat: int, policies: list[str], **options):
+        for run in range(1, repeat + 1):
+            randomness = Random(run)
+            profiles = {account_id: (
+                settings.BOT_SCHEDULER_DEFAULT_LATENCY * randomness.lognormvariate(0, 0.75),
+                0.5 if randomness.random() < 0.1 else 0.02
+            ) for account_id in range(1, accounts + 1)}
+            for policy in policies:
+                simulated_accounts = [models.CFBotAccount(
+                    id=account_id, is_verified=account_id % 4 != 0, last_assignment=timezone.now()
+                ) for account_id in profiles]
+                start = perf_counter()
+                makespan, failed = self._simulate(
+                    import_string(policy)(), simulated_accounts, profiles, submissions, run
+                )
+                self.stdout.write(self.style.SUCCESS(
+                    f'Run {run}: {policy.rsplit(".", 1)[-1]}: {submissions} submissions over {accounts} accounts, '
+                    f'{makespan / 60:.1f} min makespan, {failed} failed, simulated in {perf_counter() - start:.2f} s.'
+                ))
+
+    def _get_finished_submissions(self, submission_ids: set[int]):
+        return list(models.CFCodeSubmission.objects.filter(
+            Q(verdict__isnull=False) & ~Q(verdict=models.CFCodeSubmission.Verdict.TESTING) | Q(status__in=(
+                models.CFCodeSubmission.Status.FAILED, models.CFCodeSubmission.Status.RESULT_NOT_FOUND
+            )), id__in=submission_ids
+        ).values_list('id', 'creation_datetime'))
+
+    async def _run_fleet(self, submission_ids: list[int], timeout: float, restart_after: float | None):
+        event_loop = asyncio.get_running_loop()
+        managers = [CFManager(event_loop)]
+        remaining, latencies = set(submission_ids), list()
+        start = event_loop.time()
+        manager_task = event_loop.create_task(managers[-1].run())
+        try:
+            while remaining and event_loop.time() - start < timeout and not manager_task.done():
+                await asyncio.sleep(0.1)
+                now = timezone.now()
+                for submission_id, creation_datetime in await sync_to_async(
+                    self._get_finished_submissions, thread_sensitive=False
+                )(remaining):
+                    remaining.discard(submission_id)
+                    latencies.append((now - creation_datetime).total_seconds())
+                if restart_after is not None and event_loop.time() - start >= restart_after * len(managers):
+                    managers[-1].stop()
+                    await manager_task
+                    managers.append(CFManager(event_loop))
+                    manager_task = event_loop.create_task(managers[-1].run())
+            elapsed = event_loop.time() - start
+        finally:
+            managers[-1].stop()
+            await manager_task
+        return managers, latencies, len(remaining), elapsed
+
+    def benchmark_fleet(self, accounts: int, submissions: int, timeout: float, latency: float, error_rate: float,
+                        judge_delay: float, no_rate_limits: bool, restart_after: float | None, **options):
+        account_ids = [account.id for account in functions.seed_accounts(accounts)]
+        file = storages.get_code_submission_storage().save(
+            'code-submissions/benchmark.cpp', ContentFile(b'int main() { return 0; }')
+        )
+        submission_ids = functions.seed_submissions(submissions, *functions.seed_problem(), file=file)
+        server = StandInServer(latency=latency, error_rate=error_rate, judge_delay=judge_delay, seed=0)
+        rate_limits = {name: {**limits, 'rate': 1e6, 'capacity': 1e6} for name, limits in
+                       settings.BOT_RATE_LIMITS.items()} if no_rate_limits else settings.BOT_RATE_LIMITS
+        queries = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        try:
+            with server.run_in_thread(), logs.start_logging(StringIO()), connection.execute_wrapper(count_query):
+                with override_settings(
+                    CODEFORCES_BASE_URL=server.url, BOT_REPORT_INTERVAL=float('inf'), BOT_RATE_LIMITS=rate_limits
+                ):
+                    managers, latencies, unfinished, elapsed = async_to_sync(self._run_fleet)(
+                        submission_ids, timeout, restart_after
+                    )
+        finally:
+            for index in range(0, len(submission_ids), settings.BOT_ASSIGNMENT_BATCH_SIZE):
+                models.CFCodeSubmission.objects.filter(
+                    id__in=submission_ids[index:index + settings.BOT_ASSIGNMENT_BATCH_SIZE]
+                ).delete()
+            models.CFBotAccount.objects.filter(id__in=account_ids).delete()
+            functions.unseed_problem()
+        submitted = sum(manager._pipeline_monitor.submitted for manager in managers)
+        failed = sum(manager._pipeline_monitor.failed for manager in managers)
+        manager = managers[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'{submitted}/{submissions} submissions over {accounts} accounts in {elapsed:.1f} s, '
+            f'{submitted / elapsed:.1f} per second, {failed} failed, {unfinished} unfinished, '
+            f'{len(managers) - 1} restarts.'
+        ))
+        if len(latencies) >= 2:
+            percentiles = quantiles(latencies, n=100)
+            self.stdout.write(self.style.SUCCESS(
+                f'Enqueue To Verdict: {percentiles[49]:.1f} s p50, {percentiles[89]:.1f} s p90, '
+                f'{percentiles[98]:.1f} s p99, {max(latencies):.1f} s max.'
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Database: {queries} queries, {queries / max(submitted, 1):.1f} per submission.'
+        ))
+        self.stdout.write(self.style.SUCCESS(f'{manager._lag_monitor}.'))
+        self.stdout.write(self.style.SUCCESS(f'Transport: {manager._transport}.'))
+        for line in manager._metrics.summary('account'):
+            self.stdout.write(self.style.SUCCESS(f'Metrics: {line}.'))
+        self.stdout.write(self.style.SUCCESS(f'{server}.'))
+
+
+__all__ = ('Command',)
@@ -5,7 +5,7 @@ import asyncio
 
 class Command(BotCommand):
     async def run_manager(self):
-        manager = CFManager(asyncio.get_running_loop(), self)
+        manager = CFManager(asyncio.get_running_loop())
         await manager.run()
 
 
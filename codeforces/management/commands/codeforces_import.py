@@ -0,0 +1,162 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Model
+from aiohttp import ClientSession
+from codeforces import models
+from codeforces.bot import urls
+from pathlib import Path
+from time import perf_counter
+import asyncio
+import json
+
+
+def truncate(model: type[Model], field: str, value: str | None):
+    return value[:model._meta.get_field(field).max_length] if value else value
+
+
+class Command(BaseCommand):
+    help = 'Imports the Codeforces contest and problem catalog, only touching rows that changed.'
+    CONTEST_FIELDS = ('name', 'type', 'phase', 'is_frozen', 'difficulty', 'kind')
+    PROBLEM_FIELDS = ('name', 'type', 'points', 'rating')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', choices=('contests', 'problems'))
+        parser.add_argument('--contests-file', type=Path, help='Saved "contest.list" API response.')
+        parser.add_argument('--problems-file', type=Path, help='Saved "problemset.problems" API response.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['only'] != 'problems':
+                self.import_contests(self._load(options['contests_file'], urls.CONTEST_LIST_URL),
+                                     options['batch_size'])
+            if options['only'] != 'contests':
+                self.import_problems(self._load(options['problems_file'], urls.PROBLEM_SET_PROBLEMS_URL)['problems'],
+                                     options['batch_size'])
+
+    async def _fetch(self, url: str):
+        async with ClientSession() as session:
+            async with session.get(url) as response:
+                return await response.json()
+
+    def _load(self, file: Path | None, url: str):
+        data = json.loads(file.read_bytes()) if file else asyncio.run(self._fetch(url))
+        if data.get('status') != 'OK':
+            raise CommandError(f'Invalid Catalog Response: "{data.get("comment")}"!')
+        return data['result']
+
+    def _report(self, name: str, created: int, updated: int, unchanged: int, start: float):
+        self.stdout.write(self.style.SUCCESS(
+            f'{name}: {created} created, {updated} updated, {unchanged} unchanged in {perf_counter() - start:.2f} s.'
+        ))
+
+    def import_contests(self, contests: list[dict], batch_size: int):
+        start = perf_counter()
+        existing_contests = {contest[0]: contest[1:] for contest in
+                             models.Contest.objects.values_list('id', *self.CONTEST_FIELDS)}
+        changed_contests = list()
+        for data in contests:
+            contest = models.Contest(
+                id=data['id'],
+                name=truncate(models.Contest, 'name', data['name']),
+                type=models.Contest.Type[data['type']],
+                phase=models.Contest.Phase[data['phase']],
+                is_frozen=data['frozen'],
+                difficulty=data.get('difficulty'),
+                kind=truncate(models.Contest, 'kind', data.get('kind'))
+            )
+            if existing_contests.get(contest.id) != tuple(getattr(contest, field) for field in self.CONTEST_FIELDS):
+                changed_contests.append(contest)
+        models.Contest.objects.bulk_create(
+            changed_contests, batch_size, update_conflicts=True, unique_fields=('id',),
+            update_fields=self.CONTEST_FIELDS
+        )
+        created = sum(contest.id not in existing_contests for contest in changed_contests)
+        self._report('Contests', created, len(changed_contests) - created, len(contests) - len(changed_contests), start)
+
+    def _get_tags(self, names: set[str], batch_size: int):
+        tags = dict(models.Tag.objects.values_list('name', 'id'))
+        if missing_names := names - tags.keys():
+            models.Tag.objects.bulk_create(
+                [models.Tag(name=name) for name in missing_names], batch_size, ignore_conflicts=True
+            )
+            tags = dict(models.Tag.objects.values_list('name', 'id'))
+        return tags
+
+    def _get_problem_sets(self, short_names: set[str], batch_size: int):
+        problem_sets = dict(models.ProblemSet.objects.values_list('short_name', 'id'))
+        if missing_short_names := short_names - problem_sets.keys():
+            models.ProblemSet.objects.bulk_create([models.ProblemSet(
+                name=truncate(models.ProblemSet, 'name', short_name), short_name=short_name
+            ) for short_name in missing_short_names], batch_size, ignore_conflicts=True)
+            problem_sets = dict(models.ProblemSet.objects.values_list('short_name', 'id'))
+        return problem_sets
+
+    def import_problems(self, problems: list[dict], batch_size: int):
+        start = perf_counter()
+        tags = self._get_tags({truncate(models.Tag, 'name', tag.lower()) for problem in problems
+                               for tag in problem['tags']}, batch_size)
+        problem_sets = self._get_problem_sets({
+            truncate(models.ProblemSet, 'short_name', problem['problemsetName'].lower())
+            for problem in problems if problem.get('problemsetName')
+        }, batch_size)
+        contest_ids = set(models.Contest.objects.values_list('id', flat=True))
+        existing_problems = {problem[:3]: (problem[3], problem[4:]) for problem in models.Problem.objects.values_list(
+            'contest_id', 'problem_set_id', 'index', 'id', *self.PROBLEM_FIELDS
+        )}
+        imported_problems, skipped = dict(), 0
+        for data in problems:
+            problem = models.Problem(
+                contest_id=data.get('contestId') if data.get('contestId') in contest_ids else None,
+                problem_set_id=problem_sets.get(truncate(
+                    models.ProblemSet, 'short_name', (data.get('problemsetName') or '').lower()
+                )),
+                index=truncate(models.Problem, 'index', data['index']),
+                name=truncate(models.Problem, 'name', data['name']),
+                type=models.Problem.Type[data['type']],
+                points=data.get('points'),
+                rating=data.get('rating')
+            )
+            if not problem.contest_id and not problem.problem_set_id:
+                skipped += 1
+                continue
+            imported_problems[problem.contest_id, problem.problem_set_id, problem.index] = problem, {
+                tags[truncate(models.Tag, 'name', tag.lower())] for tag in data['tags']
+            }
+        new_problems, updated_problems = list(), list()
+        for key, (problem, _) in imported_problems.items():
+            match existing_problems.get(key):
+                case None:
+                    new_problems.append(problem)
+                case problem_id, values:
+                    problem.id = problem_id
+                    if values != tuple(getattr(problem, field) for field in self.PROBLEM_FIELDS):
+                        updated_problems.append(problem)
+        models.Problem.objects.bulk_create(new_problems, batch_size)
+        models.Problem.objects.bulk_update(updated_problems, self.PROBLEM_FIELDS, batch_size)
+        self._report('Problems', len(new_problems), len(updated_problems),
+                     len(imported_problems) - len(new_problems) - len(updated_problems), start)
+        if skipped:
+            self.stdout.write(self.style.NOTICE(f'Problems: {skipped} skipped without a known contest or problem set!'))
+        self._import_problem_tags(list(imported_problems.values()), batch_size)
+
+    def _import_problem_tags(self, problem_tags: list[tuple[models.Problem, set[int]]], batch_size: int):
+        start = perf_counter()
+        through = models.Problem.tags.through
+        problem_ids = {problem.id for problem, _ in problem_tags}
+        existing_pairs = {(problem_id, tag_id): pair_id for pair_id, problem_id, tag_id in
+                          through.objects.values_list('id', 'problem_id', 'tag_id') if problem_id in problem_ids}
+        pairs = {(problem.id, tag_id) for problem, tag_ids in problem_tags for tag_id in tag_ids}
+        through.objects.bulk_create([
+            through(problem_id=problem_id, tag_id=tag_id) for problem_id, tag_id in pairs - existing_pairs.keys()
+        ], batch_size, ignore_conflicts=True)
+        stale_pair_ids = [existing_pairs[pair] for pair in existing_pairs.keys() - pairs]
+        for index in range(0, len(stale_pair_ids), batch_size):
+            through.objects.filter(id__in=stale_pair_ids[index:index + batch_size]).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Problem Tags: {len(pairs - existing_pairs.keys())} added, {len(stale_pair_ids)} removed, '
+            f'{len(pairs & existing_pairs.keys())} unchanged in {perf_counter() - start:.2f} s.'
+        ))
+
+
+__all__ = ('Command',)
@@ -0,0 +1,26 @@
+from django.core.management import BaseCommand
+from aiohttp import web
+from codeforces.bot.stand_in import StandInServer
+
+
+class Command(BaseCommand):
+    help = 'Serves a local Codeforces stand-in, point CODEFORCES_BASE_URL at it to run the bot against it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='localhost')
+        parser.add_argument('--port', type=int, default=8080)
+        parser.add_argument('--latency', type=float, default=0.0, help='Mean response latency in seconds.')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with 503.')
+        parser.add_argument('--retry-after', type=float, default=1.0)
+        parser.add_argument('--judge-delay', type=float, default=1.0, help='Mean judging time in seconds.')
+        parser.add_argument('--seed', type=int)
+
+    def handle(self, *args, **options):
+        server = StandInServer(
+            options['host'], options['port'], options['latency'], options['error_rate'], options['retry_after'],
+            options['judge_delay'], options['seed']
+        )
+        web.run_app(server.app, host=server.host, port=server.port, print=self.stdout.write)
+
+
+__all__ = ('Command',)
@@ -0,0 +1,123 @@
+# Generated by Django 5.0.4 on 2026-10-17 07:57
+
+import common.fields
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('common', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CFBotAccount',
+            fields=[
+                ('botaccount_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='common.botaccount')),
+            ],
+            bases=('common.botaccount',),
+        ),
+        migrations.CreateModel(
+            name='Contest',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=64)),
+                ('type', models.PositiveSmallIntegerField(choices=[(1, 'CF'), (2, 'IOI'), (3, 'ICPC')])),
+                ('phase', models.PositiveSmallIntegerField(choices=[(1, 'Before'), (2, 'Coding'), (3, 'Pending System Test'), (4, 'System Test'), (5, 'Finished')])),
+                ('is_frozen', models.BooleanField()),
+                ('difficulty', models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)])),
+                ('kind', models.CharField(blank=True, max_length=64, null=True)),
+            ],
+            options={
+                'ordering': ('-id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='ProblemSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64)),
+                ('short_name', common.fields.ICharField(max_length=16, unique=True)),
+            ],
+            options={
+                'ordering': ('-id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='ProgrammingLanguage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=32)),
+                ('website_id', models.PositiveSmallIntegerField(unique=True)),
+            ],
+            options={
+                'ordering': ('-id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', common.fields.ICharField(max_length=64, unique=True)),
+            ],
+            options={
+                'ordering': ('-id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='Problem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.CharField(max_length=8)),
+                ('name', models.CharField(max_length=64)),
+                ('type', models.PositiveSmallIntegerField(choices=[(1, 'Programming'), (2, 'Question')])),
+                ('points', models.FloatField(blank=True, null=True)),
+                ('rating', models.PositiveSmallIntegerField()),
+                ('contest', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='problems', to='codeforces.contest')),
+                ('problem_set', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='problems', to='codeforces.problemset')),
+                ('tags', models.ManyToManyField(related_name='problems', to='codeforces.tag')),
+            ],
+            options={
+                'ordering': ('-id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='CFCodeSubmission',
+            fields=[
+                ('codesubmission_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='common.codesubmission')),
+                ('verdict', models.PositiveSmallIntegerField(blank=True, choices=[(1, 'Failed'), (2, 'Partial'), (3, 'Compilation Error'), (4, 'Runtime Error'), (5, 'Wrong Answer'), (6, 'Presentation Error'), (7, 'Time Limit Exceeded'), (8, 'Memory Limit Exceeded'), (9, 'Idleness Limit Exceeded'), (10, 'Security Violated'), (11, 'Crashed'), (12, 'Input Preparation Crashed'), (13, 'Challenged'), (14, 'Skipped'), (15, 'Testing'), (16, 'Rejected'), (17, 'OK')], null=True)),
+                ('test_set', models.PositiveSmallIntegerField(blank=True, choices=[(1, 'Samples'), (2, 'Pretests'), (3, 'Tests'), (4, 'Challenges'), (5, 'Tests 1'), (6, 'Tests 2'), (7, 'Tests 3'), (8, 'Tests 4'), (9, 'Tests 5'), (10, 'Tests 6'), (11, 'Tests 7'), (12, 'Tests 8'), (13, 'Tests 9'), (14, 'Tests 10')], null=True)),
+                ('passed_test_count', models.PositiveSmallIntegerField(default=0)),
+                ('time_consumed', models.BigIntegerField(blank=True, help_text='In Milliseconds', null=True)),
+                ('memory_consumed', models.BigIntegerField(blank=True, help_text='In Bytes', null=True)),
+                ('points', models.FloatField(blank=True, null=True)),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='codeforces.problem')),
+                ('programming_language', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='codeforces.programminglanguage')),
+            ],
+            options={
+                'ordering': ('-id',),
+            },
+            bases=('common.codesubmission',),
+        ),
+        migrations.AddConstraint(
+            model_name='cfcodesubmission',
+            constraint=models.CheckConstraint(check=models.Q(('verdict__isnull', True), models.Q(('memory_consumed__isnull', False), ('passed_test_count__isnull', False), ('time_consumed__isnull', False), ('verdict__isnull', False)), _connector='OR'), name='valid_submission_result'),
+        ),
+        migrations.AddConstraint(
+            model_name='problem',
+            constraint=models.CheckConstraint(check=models.Q(('contest__isnull', False), ('problem_set__isnull', False), _connector='OR'), name='valid_problem'),
+        ),
+        migrations.AddConstraint(
+            model_name='problem',
+            constraint=models.UniqueConstraint(condition=models.Q(('contest__isnull', False)), fields=('contest', 'index'), name='unique_contest_problem'),
+        ),
+        migrations.AddConstraint(
+            model_name='problem',
+            constraint=models.UniqueConstraint(condition=models.Q(('problem_set__isnull', False)), fields=('problem_set', 'index'), name='unique_problem_set_problem'),
+        ),
+    ]
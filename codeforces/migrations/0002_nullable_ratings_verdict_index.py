@@ -0,0 +1,29 @@
+# Generated by Django 5.0.4 on 2026-10-17 07:57
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('codeforces', '0001_initial'),
+        ('common', '0002_bot_pipeline'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contest',
+            name='difficulty',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)]),
+        ),
+        migrations.AlterField(
+            model_name='problem',
+            name='rating',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='cfcodesubmission',
+            index=models.Index(condition=models.Q(('verdict__isnull', True), ('verdict', 15), _connector='OR'), fields=['verdict'], name='cf_code_submission_verdict'),
+        ),
+    ]
@@ -48,7 +48,9 @@ class Contest(models.Model):
     type = models.PositiveSmallIntegerField(choices=Type.choices)
     phase = models.PositiveSmallIntegerField(choices=Phase.choices)
     is_frozen = models.BooleanField()
-    difficulty = models.PositiveSmallIntegerField(validators=(MinValueValidator(1), MaxValueValidator(5)))
+    difficulty = models.PositiveSmallIntegerField(
+        blank=True, null=True, validators=(MinValueValidator(1), MaxValueValidator(5))
+    )
     kind = models.CharField(max_length=64, blank=True, null=True)
 
     class Meta:
@@ -69,7 +71,7 @@ class Problem(models.Model):
     name = models.CharField(max_length=64)
     type = models.PositiveSmallIntegerField(choices=Type.choices)
     points = models.FloatField(blank=True, null=True)
-    rating = models.PositiveSmallIntegerField()
+    rating = models.PositiveSmallIntegerField(blank=True, null=True)
     tags = models.ManyToManyField(Tag, 'problems')
 
     class Meta:
@@ -150,6 +152,10 @@ class CFCodeSubmission(common_models.CodeSubmission):
 
     class Meta:
         ordering = ('-id',)
+        indexes = (models.Index(
+            fields=('verdict',), name='cf_code_submission_verdict',
+            condition=models.Q(verdict__isnull=True) | models.Q(verdict=15)
+        ),)
         constraints = (models.CheckConstraint(check=models.Q(verdict__isnull=True) | (models.Q(
             verdict__isnull=False,
             passed_test_count__isnull=False,
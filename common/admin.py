@@ -11,13 +11,23 @@ class BotAccountAdmin(admin.ModelAdmin):
     list_per_page = 15
 
 
+@admin.register(models.BotSession)
+class BotSessionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'bot_account', 'update_datetime')
+    exclude = ('cookies',)
+    raw_id_fields = ('bot_account',)
+    date_hierarchy = 'update_datetime'
+    list_per_page = 15
+
+
 @admin.register(models.CodeSubmission)
 class CodeSubmissionAdmin(admin.ModelAdmin):
     list_display = ('id', 'bot_account', 'status', 'creation_datetime')
     list_filter = ('bot_account', 'status')
+    raw_id_fields = ('original',)
     date_hierarchy = 'creation_datetime'
     list_per_page = 15
-    search_fields = ('id', 'bot_account__email')
+    search_fields = ('id', 'bot_account__email', 'source_hash')
 
 
 __all__ = ('BotAccountAdmin',)
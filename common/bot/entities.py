@@ -1,14 +1,27 @@
-from django.db.models import IntegerChoices
+from django.db.models import IntegerChoices, Q, QuerySet
+from django.db import transaction, connections, close_old_connections
 from django.utils import timezone
-from aiohttp import ClientSession, ClientResponse
+from django.conf import settings
+from asgiref.sync import sync_to_async
+from aiohttp import ClientSession, ClientResponse, ClientError, ClientConnectionError
 from abc import ABC, abstractmethod
-from . import exceptions
+from . import exceptions, extractors, logs, metrics, notifications, retries
+from .rate_limits import RateLimiter, parse_retry_after
+from .transport import Transport
+from .monitors import EventLoopLagMonitor, PipelineMonitor
+from .scheduling import Scheduler
+from concurrent.futures import Executor
 from functools import wraps
 from aiohttp import TooManyRedirects
 from common import models
-from bs4 import BeautifulSoup
 import asyncio
-from django.core.management import BaseCommand
+from http.cookies import SimpleCookie
+from yarl import URL
+from datetime import datetime, timedelta
+from socket import gethostname
+from os import getpid
+from signal import Signals, SIGINT, SIGTERM
+from uuid import uuid4
 
 
 class Bot(ABC):
@@ -22,24 +35,61 @@ class Bot(ABC):
 
     active_accounts: dict[int, models.BotAccount] = dict()
     inactive_accounts: set[int] = set()
+    in_flight_submissions: set[int] = set()
     _account: models.BotAccount
     _status: Status
     _session: ClientSession
-    _command: BaseCommand
-
-    def __init__(self, account: models.BotAccount, session: ClientSession, command: BaseCommand):
+    _logger: logs.BotLogger
+    _owner: str | None
+    _extractor: extractors.Extractor
+    _executor: Executor | None
+    _notifier: notifications.Notifier | None
+    _rate_limiter: RateLimiter
+    _pipeline_monitor: PipelineMonitor
+    _scheduler: Scheduler | None
+    _retry_policy: retries.RetryPolicy
+    _circuit_breakers: retries.CircuitBreakers
+    _metrics: metrics.Metrics
+    _queued: set[int]
+    _submitted: asyncio.Event
+    _authentications: int
+    _authentication_lock: asyncio.Lock
+    _submit_lock: asyncio.Lock
+
+    def __init__(self, account: models.BotAccount, session: ClientSession, executor: Executor | None = None,
+                 notifier: notifications.Notifier | None = None, rate_limiter: RateLimiter | None = None,
+                 pipeline_monitor: PipelineMonitor | None = None, scheduler: Scheduler | None = None,
+                 retry_policy: retries.RetryPolicy | None = None,
+                 circuit_breakers: retries.CircuitBreakers | None = None):
         self._account = account
+        self._owner = account.owner
         self._status = Bot.Status.BEFORE_AUTHENTICATION
         self._session = session
-        self._command = command
+        self._logger = logs.get_logger(account=str(account))
+        self._extractor = extractors.get_extractor()
+        self._executor = executor
+        self._notifier = notifier
+        self._rate_limiter = rate_limiter or RateLimiter()
+        self._pipeline_monitor = pipeline_monitor or PipelineMonitor()
+        self._scheduler = scheduler
+        self._retry_policy = retry_policy or retries.RetryPolicy()
+        self._circuit_breakers = circuit_breakers or retries.CircuitBreakers()
+        self._metrics = metrics.get_metrics()
+        self._queued = set()
+        self._submitted = asyncio.Event()
+        self._authentications = 0
+        self._authentication_lock = asyncio.Lock()
+        self._submit_lock = asyncio.Lock()
 
     async def __aenter__(self):
-        self._command.stdout.write(self._command.style.SUCCESS(f'{self._account}: Started.'))
+        self._logger.info('Started.')
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        self._command.stderr.write(self._command.style.NOTICE(f'{self._account}: Stopped!'))
+        self._logger.warning('Stopped!')
         self.inactive_accounts.discard(self._account.id)
+        if self._scheduler:
+            self._scheduler.forget(self._account.id)
         match exc_type:
             case exceptions.AuthenticationFailed:
                 self._account.status = models.BotAccount.Status.AUTHENTICATION_FAILED
@@ -51,27 +101,78 @@ class Bot(ABC):
                 return True
         del self.active_accounts[self._account.id]
 
+    async def _request(self, method: str, url: str, *buckets: str, in_flight: int | None = None, **kwargs):
+        buckets = buckets or (RateLimiter.PAGE,)
+        endpoint = URL(url).path
+        self._retry_policy.budget.deposit()
+        attempt = 0
+        while True:
+            self._circuit_breakers.acquire(self._account.id, endpoint)
+            await self._rate_limiter.acquire(buckets, self._account.id)
+            if in_flight is not None:
+                self.in_flight_submissions.add(in_flight)
+            try:
+                with self._metrics.time('bot_http_request_seconds', method=method, endpoint=endpoint):
+                    response = await self._session.request(method, url, **kwargs)
+            except (ClientConnectionError, asyncio.TimeoutError) as e:
+                self._circuit_breakers.record(self._account.id, endpoint, False)
+                if not self._retry_policy.retry(method, attempt, e) or not self._rewind(kwargs.get('data')):
+                    raise
+                self._logger.warning(f'Request Failed! {e!r}', extra={'url': url})
+            else:
+                self._metrics.increment(
+                    'bot_http_responses_total', method=method, endpoint=endpoint, status=response.status
+                )
+                self._circuit_breakers.record(self._account.id, endpoint, response.status < 500)
+                if (not self._retry_policy.retry(method, attempt, response.status)
+                        or not self._rewind(kwargs.get('data'))):
+                    return response
+                response.release()
+                if response.status in retries.REJECTED_STATUSES:
+                    self._rate_limiter.penalize(
+                        buckets, parse_retry_after(response.headers.get('Retry-After')), self._account.id
+                    )
+                    self._logger.warning('Rate Limited!', extra={'status': response.status, 'url': url})
+                else:
+                    self._logger.warning('Request Failed!', extra={'status': response.status, 'url': url})
+            self._metrics.increment('bot_http_retries_total', method=method, endpoint=endpoint)
+            await asyncio.sleep(self._retry_policy.delay(attempt))
+            attempt += 1
+
+    @staticmethod
+    def _rewind(data: dict | None):
+        for value in (data or dict()).values():
+            if hasattr(value, 'seek'):
+                if value.closed:
+                    return False
+                value.seek(0)
+        return True
+
+    def _time(self, stage: str):
+        return self._metrics.time('bot_stage_seconds', stage=stage, account=self._account.id)
+
     def _check_page_load(self, response: ClientResponse):
         if response.status != 200:
-            raise exceptions.PageLoadFailed(str(response.url))
+            raise exceptions.PageLoadFailed(str(response.url), response.status)
 
     @abstractmethod
-    def _check_authentication(self, soup: BeautifulSoup):
+    def _check_authentication(self, page: extractors.Page):
         pass
 
     @staticmethod
     def _retry_authentication(method):
         @wraps(method)
         async def func(self, *args, **kwargs):
+            authentications = self._authentications
             try:
                 return await method(self, *args, **kwargs)
-            except (TooManyRedirects, exceptions.AuthenticationFailed) as e:
-                self._logged_out()
-                await self.login()
+            except (TooManyRedirects, exceptions.AuthenticationFailed):
+                async with self._authentication_lock:
+                    if self._authentications == authentications:
+                        self._logged_out()
+                        await self.login()
                 try:
-                    return await (method(self, *args, **kwargs)
-                                  if isinstance(e, TooManyRedirects) and len(e.history) == 1
-                                  else self._session.get(e.history[-1].url))
+                    return await method(self, *args, **kwargs)
                 except TooManyRedirects as e:
                     raise exceptions.PageLoadFailed(str(e.request_info.url))
 
@@ -79,24 +180,53 @@ class Bot(ABC):
 
     def _logged_out(self):
         self._status = Bot.Status.BEFORE_AUTHENTICATION
-        self._command.stdout.write(self._command.style.NOTICE(f'{self._account}: Logged Out!'))
+        self._logger.warning('Logged Out!')
 
     def _logged_in(self):
         self._status = Bot.Status.READY
-        self._command.stdout.write(self._command.style.SUCCESS(f'{self._account}: Logged In.'))
+        self._authentications += 1
+        self._logger.info('Logged In.')
 
     async def login(self):
         if self._status != Bot.Status.BEFORE_AUTHENTICATION:
             raise exceptions.InvalidBotStateException(Bot.Status.BEFORE_AUTHENTICATION, self._status)
 
+    async def resume(self):
+        if self._status != Bot.Status.BEFORE_AUTHENTICATION:
+            raise exceptions.InvalidBotStateException(Bot.Status.BEFORE_AUTHENTICATION, self._status)
+
+    async def _restore_session(self):
+        try:
+            bot_session = await models.BotSession.objects.aget(bot_account=self._account)
+        except models.BotSession.DoesNotExist:
+            return None
+        for cookie in bot_session.cookies:
+            if not isinstance(cookie, dict):
+                continue
+            (simple_cookie := SimpleCookie()).load(cookie['cookie'])
+            if cookie['host_only']:
+                for morsel in simple_cookie.values():
+                    morsel['domain'] = ''
+            self._session.cookie_jar.update_cookies(simple_cookie, URL.build(scheme='https', host=cookie['host']))
+        return bot_session
+
+    async def _store_session(self, **fields):
+        host_only_cookies = getattr(self._session.cookie_jar, '_host_only_cookies', None)
+        await models.BotSession.objects.aupdate_or_create(bot_account=self._account, defaults={
+            'cookies': [{
+                'cookie': morsel.OutputString(),
+                'host': morsel['domain'].lstrip('.'),
+                'host_only': host_only_cookies is None or (morsel['domain'], morsel.key) in host_only_cookies
+            } for morsel in self._session.cookie_jar],
+            **fields
+        })
+
     @abstractmethod
-    @_retry_authentication
-    async def _load_submit_page(self) -> tuple[str, BeautifulSoup]:
+    async def _load_submit_page(self) -> tuple[str, str]:
         pass
 
     @abstractmethod
-    @_retry_authentication
-    async def _submit_code_page(self, url: str, soup: BeautifulSoup, submission: models.CodeSubmission):
+    async def _submit_code_page(self, url: str, csrf_token: str, submission: models.CodeSubmission):
         pass
 
     @abstractmethod
@@ -105,21 +235,24 @@ class Bot(ABC):
 
     async def logout(self):
         self._status = Bot.Status.LOGGED_OUT
+        await models.BotSession.objects.filter(bot_account=self._account).adelete()
 
     @abstractmethod
-    def _extract_csrf_token(self, soup: BeautifulSoup):
+    def _extract_csrf_token(self, page: extractors.Page):
         pass
 
-    async def _generate_soup(self, response: ClientResponse):
+    async def _extract(self, response: ClientResponse, *queries: extractors.Query):
         self._check_page_load(response)
-        return BeautifulSoup(await response.read(), 'html.parser')
+        return extractors.Page(str(response.url), queries, await extractors.extract(
+            self._extractor, self._executor, await response.read(), queries
+        ))
 
     async def _check_account(self):
         try:
             await self._account.arefresh_from_db()
         except models.BotAccount.DoesNotExist:
             raise exceptions.InactiveAccount(self._account)
-        if self._account.status != models.BotAccount.Status.ACTIVE:
+        if self._account.status != models.BotAccount.Status.ACTIVE or self._account.owner != self._owner:
             raise exceptions.InactiveAccount(self._account)
 
     @abstractmethod
@@ -127,29 +260,212 @@ class Bot(ABC):
         pass
 
     @abstractmethod
-    async def _get_submissions_result(self):
+    async def _get_submissions_result(self, sweep: bool = False) -> float | None:
         pass
 
-    async def run(self):
-        await self.login()
+    @staticmethod
+    def _result_poll_delay(submission_datetime: datetime | None):
+        if not submission_datetime:
+            return float(settings.BOT_RESULT_POLL_MAX_INTERVAL)
+        return min(max(
+            (timezone.now() - submission_datetime).total_seconds() * settings.BOT_RESULT_POLL_BACKOFF,
+            settings.BOT_RESULT_POLL_INTERVAL
+        ), settings.BOT_RESULT_POLL_MAX_INTERVAL)
+
+    async def _wait(self, channel: str, timeout: float):
+        if not self._notifier:
+            await asyncio.sleep(timeout)
+            return set()
+        return await self._notifier.wait(channel, timeout=timeout)
+
+    async def _feed_submissions(self, queue: asyncio.Queue):
+        while True:
+            with self._time('fetch_submissions'):
+                submissions = [submission async for submission in self._get_submissions().exclude(
+                    pk__in=self._queued
+                )[:settings.BOT_SUBMIT_QUEUE_SIZE]]
+            for submission in submissions:
+                self._queued.add(submission.id)
+                await queue.put(submission)
+            if len(submissions) < settings.BOT_SUBMIT_QUEUE_SIZE:
+                if submissions and self._notifier:
+                    self._notifier.set(notifications.MANAGER_CHANNEL)
+                await self._wait(
+                    notifications.submissions_channel(self._account.id), settings.BOT_RESULT_POLL_INTERVAL
+                )
+
+    def _record_submission(self, submission: models.CodeSubmission, latency: float):
+        self._pipeline_monitor.record_submission(succeeded := submission.status != models.CodeSubmission.Status.FAILED)
+        if not self._scheduler:
+            return
+        if submission.status == models.CodeSubmission.Status.DUPLICATE:
+            self._scheduler.record_skip(self._account.id)
+        else:
+            self._scheduler.record_submission(self._account.id, latency, succeeded)
+
+    async def _submit_submissions(self, queue: asyncio.Queue):
+        event_loop = asyncio.get_running_loop()
+        while True:
+            submission = await queue.get()
+            start = event_loop.time()
+            try:
+                with self._time('submit'):
+                    await self._submit_code(submission)
+                self.in_flight_submissions.discard(submission.id)
+                self._record_submission(submission, event_loop.time() - start)
+                self._submitted.set()
+            except asyncio.CancelledError:
+                if submission.id in self.in_flight_submissions:
+                    await self._abandon(submission)
+                raise
+            except Exception as e:
+                self.in_flight_submissions.discard(submission.id)
+                if self._scheduler:
+                    self._scheduler.record_submission(self._account.id, event_loop.time() - start, False)
+                if not retries.is_transient(e):
+                    self._pipeline_monitor.record_submission(False)
+                    raise
+                await self._hand_back(submission, e)
+                self._circuit_breakers.check(self._account.id)
+            finally:
+                self._queued.discard(submission.id)
+                queue.task_done()
+
+    async def _hand_back(self, submission: models.CodeSubmission, error: Exception):
+        await models.CodeSubmission.objects.filter(
+            pk=submission.pk, owner=self._owner, status=models.CodeSubmission.Status.IN_PROGRESS
+        ).aupdate(
+            status=models.CodeSubmission.Status.PENDING, bot_account=None, owner=None, heartbeat=None, lease_expiry=None
+        )
+        self._logger.warning(f'Submission Handed Back! {error}', extra={'submission': submission.id, 'stage': 'submit'})
+        if self._notifier:
+            self._notifier.set(notifications.MANAGER_CHANNEL)
+
+    async def _abandon(self, submission: models.CodeSubmission):
+        await models.CodeSubmission.objects.filter(
+            pk=submission.pk, owner=self._owner, status=models.CodeSubmission.Status.IN_PROGRESS
+        ).aupdate(status=models.CodeSubmission.Status.FAILED)
+        self.in_flight_submissions.discard(submission.id)
+        self._pipeline_monitor.record_submission(False)
+        self._logger.warning(
+            'Submission Abandoned! Its outcome is unknown.', extra={'submission': submission.id, 'stage': 'submit'}
+        )
+
+    async def _poll_results(self):
+        event_loop = asyncio.get_running_loop()
+        last_sweep = event_loop.time()
+        while True:
+            if sweep := event_loop.time() - last_sweep >= settings.BOT_RESULT_SWEEP_INTERVAL:
+                last_sweep = event_loop.time()
+            try:
+                with self._time('sweep_results' if sweep else 'poll_results'):
+                    delay = await self._get_submissions_result(sweep)
+            except Exception as e:
+                if not retries.is_transient(e):
+                    raise
+                self._circuit_breakers.check(self._account.id)
+                self._logger.warning(f'Getting Submissions Result Failed! {e}', extra={'stage': 'results'})
+                delay = max(getattr(e, 'retry_after', 0), settings.BOT_RESULT_POLL_INTERVAL)
+            if delay is None:
+                delay = settings.BOT_RESULT_SWEEP_INTERVAL
+            try:
+                await asyncio.wait_for(self._submitted.wait(), delay)
+            except asyncio.TimeoutError:
+                continue
+            self._submitted.clear()
+            await asyncio.sleep(settings.BOT_RESULT_POLL_INTERVAL)
+
+    async def _check_health(self):
         while self._account.id not in self.inactive_accounts:
-            async for submission in self._get_submissions():
-                await self._submit_code(submission)
-                await asyncio.sleep(1)
-            await self._get_submissions_result()
-            await asyncio.sleep(5)
-            await self._check_account()
+            await self._wait(notifications.account_channel(self._account.id), settings.BOT_ACCOUNT_CHECK_INTERVAL)
+            with self._time('check_account'):
+                await self._check_account()
+
+    async def _drain(self, queue: asyncio.Queue, workers: list[asyncio.Task]):
+        while not queue.empty():
+            self._queued.discard(queue.get_nowait().id)
+            queue.task_done()
+        try:
+            await asyncio.wait_for(queue.join(), settings.BOT_SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async def run(self):
+        with self._time('resume'):
+            resumed = await self.resume()
+        if not resumed:
+            with self._time('login'):
+                await self.login()
+        queue = asyncio.Queue(settings.BOT_SUBMIT_QUEUE_SIZE)
+        workers = [asyncio.create_task(self._submit_submissions(queue))
+                   for _ in range(settings.BOT_SUBMIT_CONCURRENCY)]
+        stages = [asyncio.create_task(stage)
+                  for stage in (self._feed_submissions(queue), self._poll_results(), self._check_health())]
+        shutdown = False
+        try:
+            done, _ = await asyncio.wait((*stages, *workers), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        except asyncio.CancelledError:
+            shutdown = True
+            raise
+        finally:
+            for stage in stages:
+                stage.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            await self._drain(queue, workers)
+            if shutdown and settings.BOT_LOGOUT_ON_SHUTDOWN:
+                await self._logout_on_shutdown()
+
+    async def _logout_on_shutdown(self):
+        try:
+            await asyncio.wait_for(self.logout(), settings.BOT_LOGOUT_TIMEOUT)
+        except (exceptions.BotException, ClientError, asyncio.TimeoutError) as e:
+            self._logger.warning(f'Logging out failed: {e}')
+        else:
+            self._logger.info('Logged out.')
 
 
 class Manager(ABC):
     _tasks: set[asyncio.Task]
     _event_loop: asyncio.AbstractEventLoop
-    _command: BaseCommand
-
-    def __init__(self, event_loop: asyncio.AbstractEventLoop, command: BaseCommand):
+    _logger: logs.BotLogger
+    _owner: str
+    _transport: Transport
+    _executor: Executor | None
+    _lag_monitor: EventLoopLagMonitor
+    _notifier: notifications.Notifier
+    _rate_limiter: RateLimiter
+    _pipeline_monitor: PipelineMonitor
+    _scheduler: Scheduler
+    _retry_policy: retries.RetryPolicy
+    _circuit_breakers: retries.CircuitBreakers
+    _metrics: metrics.Metrics
+    _stopping: asyncio.Event
+    _failures: dict[int, int]
+    _restart_times: dict[int, float]
+
+    def __init__(self, event_loop: asyncio.AbstractEventLoop):
         self._tasks = set()
         self._event_loop = event_loop
-        self._command = command
+        self._logger = logs.get_logger()
+        self._owner = f'{gethostname()}:{getpid()}:{uuid4().hex[:8]}'
+        self._transport = Transport()
+        self._executor = extractors.create_executor()
+        self._lag_monitor = EventLoopLagMonitor()
+        self._notifier = notifications.Notifier()
+        self._rate_limiter = RateLimiter()
+        self._pipeline_monitor = PipelineMonitor()
+        self._scheduler = Scheduler()
+        self._retry_policy = retries.RetryPolicy()
+        self._circuit_breakers = retries.CircuitBreakers()
+        self._metrics = metrics.get_metrics()
+        self._stopping = asyncio.Event()
+        self._failures = dict()
+        self._restart_times = dict()
 
     @abstractmethod
     def _get_active_accounts(self):
@@ -163,40 +479,259 @@ class Manager(ABC):
     def _get_submissions(self):
         pass
 
-    async def _assign_tasks(self):
-        await self._get_submissions().exclude(bot_account__in=Bot.active_accounts).filter(
+    def _lease(self, now: datetime):
+        return {
+            'owner': self._owner,
+            'heartbeat': now,
+            'lease_expiry': now + timedelta(seconds=settings.BOT_LEASE_DURATION)
+        }
+
+    def _claimable(self, now: datetime):
+        return Q(owner__isnull=True) | Q(owner=self._owner) | Q(lease_expiry__lt=now)
+
+    @staticmethod
+    def _skip_locked(queryset: QuerySet):
+        if connections[queryset.db].features.has_select_for_update_skip_locked:
+            return queryset.select_for_update(skip_locked=True)
+        return queryset
+
+    def _claim_accounts(self, excluded: tuple[int, ...] = ()):
+        if (limit := settings.BOT_ACCOUNTS_PER_MANAGER) is not None:
+            if (limit := limit - len(Bot.active_accounts)) <= 0:
+                return list()
+        now = timezone.now()
+        with transaction.atomic():
+            account_ids = list(self._skip_locked(models.BotAccount.objects.filter(
+                self._claimable(now), pk__in=self._get_active_accounts().values('pk')
+            ).exclude(pk__in=(*Bot.active_accounts, *excluded))).values_list('pk', flat=True)[:limit])
+            models.BotAccount.objects.filter(self._claimable(now), pk__in=account_ids).update(**self._lease(now))
+        return list(self._get_active_accounts().filter(owner=self._owner, heartbeat=now))
+
+    def _get_leased_submissions(self):
+        return models.CodeSubmission.objects.filter(
+            owner=self._owner, status=models.CodeSubmission.Status.IN_PROGRESS, bot_account__in=Bot.active_accounts
+        )
+
+    def _get_pending_submissions(self):
+        return models.CodeSubmission.objects.filter(
+            pk__in=self._get_submissions().values('pk'), status=models.CodeSubmission.Status.PENDING
+        )
+
+    def _get_stale_submissions(self):
+        return self._get_submissions().filter(
+            Q(owner__isnull=True) | Q(lease_expiry__lt=timezone.now()) |
+            (Q(owner=self._owner) & ~Q(bot_account__in=Bot.active_accounts)),
             status=models.CodeSubmission.Status.IN_PROGRESS
-        ).aupdate(status=models.CodeSubmission.Status.PENDING, bot_account=None)
-        if not (active_accounts := [active_account async for active_account in self._get_active_accounts()]):
+        )
+
+    def _release_leases(self):
+        with transaction.atomic():
+            abandoned_submissions = models.CodeSubmission.objects.filter(
+                owner=self._owner, status=models.CodeSubmission.Status.IN_PROGRESS,
+                pk__in=Bot.in_flight_submissions
+            ).update(status=models.CodeSubmission.Status.FAILED)
+            released_submissions = models.CodeSubmission.objects.filter(
+                owner=self._owner, status=models.CodeSubmission.Status.IN_PROGRESS
+            ).update(
+                status=models.CodeSubmission.Status.PENDING, bot_account=None, owner=None, heartbeat=None,
+                lease_expiry=None
+            )
+            released_accounts = models.BotAccount.objects.filter(owner=self._owner).update(
+                owner=None, heartbeat=None, lease_expiry=None
+            )
+        Bot.in_flight_submissions.clear()
+        return released_accounts, released_submissions, abandoned_submissions
+
+    async def _renew_leases(self):
+        lease = self._lease(timezone.now())
+        await models.BotAccount.objects.filter(owner=self._owner, pk__in=Bot.active_accounts).aupdate(**lease)
+        await self._get_leased_submissions().aupdate(**lease)
+
+    def _apply_assignments(self, active_accounts: list[models.BotAccount]):
+        now = timezone.now()
+        with transaction.atomic():
+            if not (capacity := self._scheduler.capacity(active_accounts)) or not (plan := self._scheduler.plan(list(
+                self._skip_locked(self._get_pending_submissions().order_by('id')).values_list(
+                    'pk', flat=True
+                )[:capacity]
+            ), active_accounts)):
+                return
+            for account_id, submission_ids in plan.items():
+                for index in range(0, len(submission_ids), settings.BOT_ASSIGNMENT_BATCH_SIZE):
+                    models.CodeSubmission.objects.filter(
+                        id__in=submission_ids[index:index + settings.BOT_ASSIGNMENT_BATCH_SIZE],
+                        status=models.CodeSubmission.Status.PENDING
+                    ).update(
+                        bot_account=account_id, status=models.CodeSubmission.Status.IN_PROGRESS, **self._lease(now)
+                    )
+            models.BotAccount.objects.filter(id__in=plan.keys()).update(last_assignment=now)
+        return plan
+
+    async def _assign_tasks(self):
+        await self._get_stale_submissions().aupdate(
+            status=models.CodeSubmission.Status.PENDING, bot_account=None, owner=None, heartbeat=None, lease_expiry=None
+        )
+        if not (active_accounts := [active_account async for active_account in self._get_active_accounts().filter(
+            owner=self._owner, pk__in=Bot.active_accounts
+        )]):
+            return
+        plan = await sync_to_async(self._apply_assignments)(active_accounts) or dict()
+        self._scheduler.assigned(plan)
+        for account_id in plan:
+            self._notifier.set(notifications.submissions_channel(account_id))
+
+    def _report(self):
+        self._logger.info(f'Transport: {self._transport}.')
+        self._logger.info(f'{self._lag_monitor}.')
+        self._logger.info(f'{self._pipeline_monitor}.')
+        self._logger.info(f'{self._scheduler}.')
+        self._logger.info(f'{self._circuit_breakers}.')
+        for line in self._metrics.summary('account'):
+            self._logger.info(f'Metrics: {line}.')
+        self._lag_monitor.reset()
+        self._pipeline_monitor.reset()
+
+    def _update_gauges(self):
+        self._metrics.set('bot_active_accounts', len(Bot.active_accounts))
+        self._metrics.set('bot_event_loop_lag_seconds', self._lag_monitor.average_lag)
+        self._metrics.set('bot_event_loop_max_lag_seconds', self._lag_monitor.max_lag)
+        self._metrics.set('bot_submission_throughput_per_minute', self._pipeline_monitor.throughput)
+        self._metrics.set('bot_transport_reused_connections', self._transport.reused_connections)
+        self._metrics.set('bot_transport_created_connections', self._transport.created_connections)
+        for (account_id, endpoint), breaker in self._circuit_breakers:
+            self._metrics.set('bot_circuit_breaker_state', breaker.state, account=account_id, endpoint=endpoint or '')
+
+    async def _export_metrics(self):
+        path = metrics.snapshot_path(self._owner)
+        try:
+            while True:
+                await asyncio.sleep(settings.BOT_METRICS_INTERVAL)
+                self._update_gauges()
+                await sync_to_async(metrics.write_snapshot, thread_sensitive=False)(path, self._metrics.to_dict())
+        finally:
+            path.unlink(missing_ok=True)
+
+    def stop(self):
+        if self._stopping.is_set():
+            self._logger.warning('Stopping immediately!')
+            for task in self._tasks:
+                task.cancel()
             return
-        current_index = 0
-        submission: models.CodeSubmission
-        async for submission in self._get_submissions().filter(status=models.CodeSubmission.Status.PENDING):
-            active_account: models.BotAccount = active_accounts[current_index]
-            submission.bot_account = active_account
-            submission.status = models.CodeSubmission.Status.IN_PROGRESS
-            await submission.asave(update_fields=('bot_account', 'status'))
-            active_account.last_assignment = timezone.now()
-            await active_account.asave(update_fields=('last_assignment',))
-            if current_index == len(active_accounts) - 1:
-                current_index = 0
+        self._logger.warning('Stopping...')
+        self._stopping.set()
+        self._notifier.set(notifications.MANAGER_CHANNEL)
+
+    async def _supervise(self, account: models.BotAccount):
+        started = self._event_loop.time()
+        try:
+            await self._run_bot(account)
+        except Exception as e:
+            if self._stopping.is_set():
+                self._logger.error(str(e), extra={'account': str(account)})
+                return
+            if isinstance(e, exceptions.CircuitOpen):
+                backoff = e.retry_after
             else:
-                current_index += 1
+                if self._event_loop.time() - started >= settings.BOT_RESTART_MAX_BACKOFF:
+                    self._failures.pop(account.id, None)
+                failures = self._failures[account.id] = self._failures.get(account.id, 0) + 1
+                backoff = min(settings.BOT_RESTART_BACKOFF * 2 ** (failures - 1), settings.BOT_RESTART_MAX_BACKOFF)
+            self._restart_times[account.id] = self._event_loop.time() + backoff
+            self._metrics.increment('bot_errors_total', error=type(e).__name__)
+            self._logger.error(f'{e} Restarting in {backoff:g} seconds.', exc_info=not isinstance(
+                e, exceptions.BotException
+            ), extra={'account': str(account)})
+            self._notifier.set(notifications.MANAGER_CHANNEL)
+        else:
+            self._failures.pop(account.id, None)
+        finally:
+            Bot.active_accounts.pop(account.id, None)
+
+    def _start_bot(self, account: models.BotAccount):
+        Bot.active_accounts[account.id] = account
+        self._restart_times.pop(account.id, None)
+        task = self._event_loop.create_task(self._supervise(account))
+        task.add_done_callback(self._tasks.remove)
+        self._tasks.add(task)
+
+    def _backing_off(self):
+        now = self._event_loop.time()
+        for account_id, restart_time in tuple(self._restart_times.items()):
+            if restart_time <= now:
+                del self._restart_times[account_id]
+        return tuple(self._restart_times)
+
+    def _wait_timeout(self):
+        if not self._restart_times:
+            return settings.BOT_POLL_INTERVAL
+        return max(0, min(settings.BOT_POLL_INTERVAL, min(self._restart_times.values()) - self._event_loop.time()))
+
+    async def _shutdown(self):
+        if self._tasks:
+            self._logger.info(f'Draining {len(self._tasks)} bots.')
+            for task in self._tasks:
+                task.cancel()
+            _, pending = await asyncio.wait(
+                tuple(self._tasks), timeout=settings.BOT_SHUTDOWN_TIMEOUT + settings.BOT_LOGOUT_TIMEOUT
+            )
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        released_accounts, released_submissions, abandoned_submissions = await sync_to_async(
+            self._release_leases
+        )()
+        notifications.publish(notifications.MANAGER_CHANNEL)
+        self._logger.info(
+            f'Released {released_accounts} accounts and {released_submissions} submissions, '
+            f'abandoned {abandoned_submissions} submissions in flight.'
+        )
+
+    def _handle_signals(self, *signals: Signals):
+        for signal in signals:
+            try:
+                self._event_loop.add_signal_handler(signal, self.stop)
+            except (NotImplementedError, RuntimeError):
+                continue
+
+    def _restore_signals(self, *signals: Signals):
+        for signal in signals:
+            try:
+                self._event_loop.remove_signal_handler(signal)
+            except (NotImplementedError, RuntimeError):
+                continue
 
     async def run(self):
-        while True:
-            active_dict = {active_account.id: active_account async for active_account in self._get_active_accounts()}
-            new_accounts = list()
-            for key, account in active_dict.items():
-                if key not in Bot.active_accounts:
-                    Bot.active_accounts[key] = account
-                    new_accounts.append(account)
-            for new_account in new_accounts:
-                task = self._event_loop.create_task(self._run_bot(new_account))
-                task.add_done_callback(self._tasks.remove)
-                self._tasks.add(task)
-            await self._assign_tasks()
-            await asyncio.sleep(5)
+        lag_monitor_task = self._event_loop.create_task(self._lag_monitor.run())
+        metrics_task = self._event_loop.create_task(self._export_metrics()) if self._metrics.enabled else None
+        await self._notifier.start()
+        self._handle_signals(SIGINT, SIGTERM)
+        try:
+            await self._run()
+        finally:
+            self._restore_signals(SIGINT, SIGTERM)
+            lag_monitor_task.cancel()
+            if metrics_task:
+                metrics_task.cancel()
+            self._notifier.close()
+            if self._executor:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self):
+        async with self._transport:
+            last_report = self._event_loop.time()
+            try:
+                while not self._stopping.is_set():
+                    await sync_to_async(close_old_connections)()
+                    await self._renew_leases()
+                    for new_account in await sync_to_async(self._claim_accounts)(self._backing_off()):
+                        self._start_bot(new_account)
+                    await self._assign_tasks()
+                    if self._event_loop.time() - last_report >= settings.BOT_REPORT_INTERVAL:
+                        self._report()
+                        last_report = self._event_loop.time()
+                    await self._notifier.wait(notifications.MANAGER_CHANNEL, timeout=self._wait_timeout())
+            finally:
+                await self._shutdown()
 
 
 __all__ = ('Bot', 'Manager')
@@ -1,8 +1,8 @@
 from typing import TYPE_CHECKING
-from bs4 import BeautifulSoup
 
 if TYPE_CHECKING:
     from common.bot.entities import Bot
+    from common.bot.extractors import Page
     from common.models import BotAccount
 
 
@@ -27,25 +27,51 @@ class InvalidBotStateException(BotException):
 
 class PageLoadFailed(BotException):
     url: str
+    status: int | None
 
-    def __init__(self, url: str):
+    def __init__(self, url: str, status: int | None = None):
         self.url = url
+        self.status = status
 
     def __str__(self):
         return f'Loading the page "{self.url}" failed!'
 
 
-class SoupException(BotException):
-    soup: BeautifulSoup
+class SubmissionOutcomeUnknown(BotException):
+    url: str
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def __str__(self):
+        return f'Submitting to "{self.url}" failed after the request was sent!'
+
+
+class CircuitOpen(BotException):
+    endpoint: str | None
+    retry_after: float
+
+    def __init__(self, endpoint: str | None, retry_after: float):
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+    def __str__(self):
+        if self.endpoint is None:
+            return f'Account circuit is open for {self.retry_after:.1f} seconds!'
+        return f'Circuit of "{self.endpoint}" is open for {self.retry_after:.1f} seconds!'
+
+
+class ExtractionException(BotException):
+    page: 'Page'
 
-    def __init__(self, soup: BeautifulSoup):
-        self.soup = soup
+    def __init__(self, page: 'Page'):
+        self.page = page
 
     def __str__(self):
-        return 'Soup Exception!'
+        return f'Extraction Exception on: "{self.page}"!'
 
 
-class CSRFTokenNotFound(SoupException):
+class CSRFTokenNotFound(ExtractionException):
     def __str__(self):
         return 'CSRF Token was not found!'
 
@@ -74,7 +100,9 @@ __all__ = (
     'BotException',
     'InvalidBotStateException',
     'PageLoadFailed',
-    'SoupException',
+    'SubmissionOutcomeUnknown',
+    'CircuitOpen',
+    'ExtractionException',
     'CSRFTokenNotFound',
     'BotAccountException',
     'AuthenticationFailed',
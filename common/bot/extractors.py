@@ -0,0 +1,222 @@
+from abc import ABC, abstractmethod
+from typing import NamedTuple
+from functools import cache
+from html import unescape
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+from django.conf import settings
+from django.utils.module_loading import import_string
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+import asyncio
+import re
+
+TAG_NAME_PATTERN = re.compile(rb'<[^\s/>]*')
+COMMENT_PATTERN = re.compile(rb'<!--.*?(?:-->|$)', re.S)
+ATTRIBUTES = rb'''(?:[^>"']|"[^"]*"|'[^']*')*'''
+ATTRIBUTE_PATTERN = re.compile(rb'''([^\s"'<>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+)))?''')
+
+
+class InputValue(NamedTuple):
+    name: str
+
+    def find(self, soup: BeautifulSoup):
+        if tag := soup.find('input', {'name': self.name}):
+            return tag.get('value')
+
+    def match(self, name: str, attrs: dict):
+        return name == 'input' and attrs.get('name') == self.name
+
+    @cache
+    def pattern(self):
+        return re.compile(
+            rb'<input\b' + ATTRIBUTES + b'?' + attribute_pattern(b'name', re.escape(self.name.encode())) +
+            ATTRIBUTES + b'>',
+            re.I
+        )
+
+    @cache
+    def hint(self):
+        return re.compile(rb'\bname\s*=\s*["\']?' + re.escape(self.name.encode()), re.I)
+
+    def scan(self, html: bytes):
+        for match in self.pattern().finditer(html):
+            if (attrs := parse_attributes(match.group())).get('name') == self.name:
+                return attrs.get('value')
+
+
+class LinkHref(NamedTuple):
+    text: str
+
+    def find(self, soup: BeautifulSoup):
+        if tag := soup.find('a', string=self.text):
+            return tag.get('href')
+
+    def match(self, name: str, attrs: dict):
+        return name == 'a'
+
+    @cache
+    def pattern(self):
+        return re.compile(
+            rb'<a\b(' + ATTRIBUTES + rb')>(?:<(?!a\b)[a-z][^\s/>]*' + ATTRIBUTES + b'>)*' +
+            text_pattern(self.text) + rb'(?:</(?!a\b)[^>]*>)*</a\s*>',
+            re.I
+        )
+
+    @cache
+    def hint(self):
+        return re.compile(b'>' + text_pattern(self.text) + b'<', re.I)
+
+    def scan(self, html: bytes):
+        if match := self.pattern().search(html):
+            return parse_attributes(match.group(1)).get('href')
+
+
+class ClassAttribute(NamedTuple):
+    class_name: str
+    attribute: str
+
+    def find(self, soup: BeautifulSoup):
+        if tag := soup.find(class_=self.class_name):
+            if isinstance(value := tag.get(self.attribute), list):
+                return ' '.join(value)
+            return value
+
+    def match(self, name: str, attrs: dict):
+        return self.class_name in (attrs.get('class') or '').split()
+
+    @cache
+    def pattern(self):
+        return re.compile(
+            rb'<[a-z][^\s/>]*' + ATTRIBUTES + b'?' +
+            attribute_pattern(b'class', re.escape(self.class_name.encode()), word=True) + ATTRIBUTES + b'>',
+            re.I
+        )
+
+    @cache
+    def hint(self):
+        return re.compile(
+            rb'\bclass\s*=\s*["\']?[^"\'>]*?(?<![\w-])' + re.escape(self.class_name.encode()) + rb'(?![\w-])', re.I
+        )
+
+    def scan(self, html: bytes):
+        for match in self.pattern().finditer(html):
+            if self.class_name in (attrs := parse_attributes(match.group())).get('class', '').split():
+                return attrs.get(self.attribute)
+
+
+Query = InputValue | LinkHref | ClassAttribute
+
+
+def text_pattern(text: str):
+    return b''.join(
+        b'(?:' + re.escape(character.encode()) + rb'|&#0*' + str(ord(character)).encode() +
+        rb';|&#x0*' + f'{ord(character):x}'.encode() + b';)' for character in text
+    )
+
+
+def attribute_pattern(name: bytes, value: bytes, word: bool = False):
+    def quoted(quote: bytes):
+        if word:
+            return quote + b'[^' + quote + rb']*?(?<![\w-])' + value + rb'(?![\w-])[^' + quote + b']*' + quote
+        return quote + value + quote
+    return rb'(?<![\w-])' + name + rb'\s*=\s*(?:' + quoted(b'"') + b'|' + quoted(b"'") + b'|' + value + rb'(?=[\s>]))'
+
+
+def parse_attributes(tag: bytes):
+    attrs = dict()
+    if tag_name := TAG_NAME_PATTERN.match(tag):
+        tag = tag[tag_name.end():]
+    for match in ATTRIBUTE_PATTERN.finditer(tag):
+        value = next((group for group in match.groups()[1:] if group is not None), b'')
+        attrs[match.group(1).decode(errors='replace').lower()] = unescape(value.decode(errors='replace'))
+    return attrs
+
+
+class Page:
+    url: str
+    _values: dict[Query, str | None]
+
+    def __init__(self, url: str, queries: tuple[Query, ...], values: tuple[str | None, ...]):
+        self.url = url
+        self._values = dict(zip(queries, values))
+
+    def __getitem__(self, query: Query):
+        return self._values[query]
+
+    def __str__(self):
+        return self.url
+
+
+class Extractor(ABC):
+    @abstractmethod
+    def extract(self, html: bytes, queries: tuple[Query, ...]) -> tuple[str | None, ...]:
+        pass
+
+
+class SoupExtractor(Extractor):
+    def extract(self, html: bytes, queries: tuple[Query, ...]):
+        soup = BeautifulSoup(html, 'html.parser')
+        return tuple(query.find(soup) for query in queries)
+
+
+class StrainedSoupExtractor(Extractor):
+    def extract(self, html: bytes, queries: tuple[Query, ...]):
+        soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer(
+            lambda name, attrs=None: not isinstance(name, Tag) and any(
+                query.match(name, attrs or dict()) for query in queries
+            )
+        ))
+        return tuple(query.find(soup) for query in queries)
+
+
+class PatternExtractor(Extractor):
+    fallback: Extractor
+
+    def __init__(self):
+        self.fallback = StrainedSoupExtractor()
+
+    def extract(self, html: bytes, queries: tuple[Query, ...]):
+        if b'<!--' in html:
+            html = COMMENT_PATTERN.sub(b'', html)
+        values = tuple(query.scan(html) for query in queries)
+        if missing := tuple(
+            query for query, value in zip(queries, values) if value is None and query.hint().search(html)
+        ):
+            found = dict(zip(missing, self.fallback.extract(html, missing)))
+            values = tuple(found.get(query, value) for query, value in zip(queries, values))
+        return values
+
+
+@cache
+def get_extractor() -> Extractor:
+    return import_string(settings.BOT_HTML_EXTRACTOR)()
+
+
+def create_executor(mode: str | None = None) -> Executor | None:
+    match mode or settings.BOT_EXTRACTION_EXECUTOR:
+        case 'thread':
+            return ThreadPoolExecutor(settings.BOT_EXTRACTION_WORKERS, thread_name_prefix='extractor')
+        case 'process':
+            return ProcessPoolExecutor(settings.BOT_EXTRACTION_WORKERS)
+    return None
+
+
+async def extract(extractor: Extractor, executor: Executor | None, html: bytes, queries: tuple[Query, ...]):
+    if executor is None:
+        return extractor.extract(html, queries)
+    return await asyncio.get_running_loop().run_in_executor(executor, extractor.extract, html, queries)
+
+
+__all__ = (
+    'InputValue',
+    'LinkHref',
+    'ClassAttribute',
+    'Query',
+    'Page',
+    'Extractor',
+    'SoupExtractor',
+    'StrainedSoupExtractor',
+    'PatternExtractor',
+    'get_extractor',
+    'create_executor',
+    'extract'
+)
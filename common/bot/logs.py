@@ -0,0 +1,110 @@
+from django.conf import settings
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from queue import Full, Queue
+from typing import TextIO
+import json
+import logging
+import sys
+
+FIELDS = ('account', 'submission', 'stage', 'duration', 'status', 'url')
+logger = logging.getLogger('common.bot')
+
+
+class BotLogger(logging.LoggerAdapter):
+    def process(self, msg, kwargs):
+        kwargs['extra'] = {**self.extra, **kwargs.get('extra', dict())}
+        return msg, kwargs
+
+
+class SamplingFilter(logging.Filter):
+    _rates: dict[str, int]
+    _counts: dict[tuple[str, str], int]
+
+    def __init__(self, rates: dict[str, int]):
+        super().__init__()
+        self._rates = rates
+        self._counts = dict()
+
+    def filter(self, record: logging.LogRecord):
+        if not (sample := getattr(record, 'sample', None)) or (rate := self._rates.get(sample, 1)) <= 1:
+            return True
+        self._counts[key] = (count := self._counts.get(key := (sample, record.msg), 0)) + 1
+        return count % rate == 0
+
+
+class DroppingQueueHandler(QueueHandler):
+    dropped: int
+
+    def __init__(self, queue: Queue):
+        super().__init__(queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            self.dropped += 1
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(prefix)s%(message)s%(suffix)s')
+
+    def format(self, record: logging.LogRecord):
+        record.prefix = f'{account}: ' if (account := getattr(record, 'account', None)) is not None else ''
+        record.suffix = ''.join(f' {field}={value}' for field in FIELDS[1:]
+                                if (value := getattr(record, field, None)) is not None)
+        return super().format(record)
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        entry.update((field, value) for field in FIELDS if (value := getattr(record, field, None)) is not None)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def get_logger(**fields):
+    return BotLogger(logger, fields)
+
+
+def create_formatter(log_format: str | None = None):
+    match log_format or settings.BOT_LOG_FORMAT:
+        case 'json':
+            return JSONFormatter()
+        case _:
+            return TextFormatter()
+
+
+@contextmanager
+def start_logging(stream: TextIO | None = None, log_format: str | None = None):
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(create_formatter(log_format))
+    queue_handler = DroppingQueueHandler(Queue(settings.BOT_LOG_QUEUE_SIZE))
+    queue_handler.addFilter(SamplingFilter(settings.BOT_LOG_SAMPLING))
+    listener = QueueListener(queue_handler.queue, handler, respect_handler_level=True)
+    logger.addHandler(queue_handler)
+    logger.setLevel(settings.BOT_LOG_LEVEL)
+    logger.propagate = False
+    listener.start()
+    try:
+        yield queue_handler
+    finally:
+        listener.stop()
+        logger.removeHandler(queue_handler)
+        logger.propagate = True
+
+
+__all__ = (
+    'logger', 'BotLogger', 'SamplingFilter', 'DroppingQueueHandler', 'TextFormatter', 'JSONFormatter', 'get_logger',
+    'create_formatter', 'start_logging'
+)
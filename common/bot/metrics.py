@@ -0,0 +1,204 @@
+from django.conf import settings
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from functools import cache
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from time import perf_counter, time
+import json
+import os
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    buckets: tuple[float, ...]
+    counts: list[int]
+    count: int
+    sum: float
+    max: float
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: 'Histogram'):
+        self.counts = [count + other_count for count, other_count in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def to_dict(self):
+        return {'counts': self.counts, 'count': self.count, 'sum': self.sum, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, buckets: tuple[float, ...], data: dict):
+        histogram = cls(buckets)
+        histogram.counts = data['counts']
+        histogram.count = data['count']
+        histogram.sum = data['sum']
+        histogram.max = data['max']
+        return histogram
+
+
+class Metrics:
+    enabled = True
+    buckets: tuple[float, ...]
+    counters: dict[tuple[str, Labels], float]
+    gauges: dict[tuple[str, Labels], float]
+    histograms: dict[tuple[str, Labels], Histogram]
+
+    def __init__(self, buckets: tuple[float, ...] = ()):
+        self.buckets = tuple(buckets or settings.BOT_METRICS_BUCKETS)
+        self.counters = dict()
+        self.gauges = dict()
+        self.histograms = dict()
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = name, tuple(sorted(labels.items()))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        self.gauges[name, tuple(sorted(labels.items()))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        if not (histogram := self.histograms.get(key := (name, tuple(sorted(labels.items()))))):
+            histogram = self.histograms[key] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    @contextmanager
+    def time(self, name: str, **labels):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, perf_counter() - start, **labels)
+
+    def to_dict(self):
+        return {
+            'buckets': self.buckets,
+            'counters': [(name, labels, value) for (name, labels), value in self.counters.items()],
+            'gauges': [(name, labels, value) for (name, labels), value in self.gauges.items()],
+            'histograms': [
+                (name, labels, histogram.to_dict()) for (name, labels), histogram in self.histograms.items()
+            ]
+        }
+
+    def merge(self, data: dict, **labels):
+        extra_labels = tuple(labels.items())
+        for name, series_labels, value in data['counters']:
+            self.increment(name, value, **dict((*map(tuple, series_labels), *extra_labels)))
+        for name, series_labels, value in data['gauges']:
+            self.set(name, value, **dict((*map(tuple, series_labels), *extra_labels)))
+        for name, series_labels, histogram in data['histograms']:
+            key = name, tuple(sorted((*map(tuple, series_labels), *extra_labels)))
+            histogram = Histogram.from_dict(tuple(data['buckets']), histogram)
+            if existing_histogram := self.histograms.get(key):
+                existing_histogram.merge(histogram)
+            else:
+                self.histograms[key] = histogram
+
+    def summary(self, *hidden_labels: str):
+        histograms = dict()
+        for (name, labels), histogram in self.histograms.items():
+            key = name, tuple((label, value) for label, value in labels if label not in hidden_labels)
+            if not (summary := histograms.get(key)):
+                summary = histograms[key] = Histogram(self.buckets)
+            summary.merge(histogram)
+        for (name, labels), histogram in sorted(histograms.items()):
+            yield (f'{name}{format_labels(labels)}: {histogram.count} observed, '
+                   f'{histogram.sum / histogram.count * 1000:.1f} ms average, {histogram.max * 1000:.1f} ms max')
+
+    def render(self):
+        lines = list()
+        for kind, series in (('counter', self.counters), ('gauge', self.gauges)):
+            for name in sorted({name for name, _ in series}):
+                lines.append(f'# TYPE {name} {kind}')
+                lines.extend(f'{name}{format_labels(labels)} {value:g}'
+                             for (series_name, labels), value in sorted(series.items()) if series_name == name)
+        for name in sorted({name for name, _ in self.histograms}):
+            lines.append(f'# TYPE {name} histogram')
+            for (series_name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                if series_name != name:
+                    continue
+                cumulative = 0
+                for bucket, count in zip((*map(str, histogram.buckets), '+Inf'), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{format_labels((*labels, ("le", bucket)))} {cumulative}')
+                lines.append(f'{name}_sum{format_labels(labels)} {histogram.sum:g}')
+                lines.append(f'{name}_count{format_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        self.counters.clear()
+        self.gauges.clear()
+        self.histograms.clear()
+
+
+class NullMetrics(Metrics):
+    enabled = False
+    _context = nullcontext()
+
+    def increment(self, name: str, value: float = 1, **labels):
+        pass
+
+    def set(self, name: str, value: float, **labels):
+        pass
+
+    def observe(self, name: str, value: float, **labels):
+        pass
+
+    def time(self, name: str, **labels):
+        return self._context
+
+
+def format_labels(labels: Labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{label}="{escape_label_value(value)}"' for label, value in labels) + '}'
+
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+@cache
+def get_metrics():
+    return Metrics() if settings.BOT_METRICS_ENABLED else NullMetrics()
+
+
+def snapshot_path(process: str):
+    return Path(settings.BOT_METRICS_DIRECTORY) / f'{process.replace(":", "-")}.json'
+
+
+def write_snapshot(path: Path, data: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with NamedTemporaryFile('w', dir=path.parent, delete=False) as file:
+        json.dump(data, file)
+    os.replace(file.name, path)
+
+
+def collect_snapshots():
+    metrics = Metrics()
+    for path in Path(settings.BOT_METRICS_DIRECTORY).glob('*.json'):
+        try:
+            if time() - path.stat().st_mtime > settings.BOT_METRICS_INTERVAL * 3:
+                continue
+            metrics.merge(json.loads(path.read_text()), process=path.stem)
+        except (OSError, ValueError):
+            continue
+    return metrics
+
+
+__all__ = (
+    'Histogram', 'Metrics', 'NullMetrics', 'get_metrics', 'snapshot_path', 'write_snapshot', 'collect_snapshots'
+)
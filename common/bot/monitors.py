@@ -0,0 +1,83 @@
+from time import monotonic
+import asyncio
+
+
+class EventLoopLagMonitor:
+    _interval: float
+    samples: int
+    total_lag: float
+    max_lag: float
+
+    def __init__(self, interval: float = 0.1):
+        self._interval = interval
+        self.reset()
+
+    def reset(self):
+        self.samples = 0
+        self.total_lag = 0.0
+        self.max_lag = 0.0
+
+    @property
+    def average_lag(self):
+        return self.total_lag / self.samples if self.samples else 0.0
+
+    async def run(self):
+        event_loop = asyncio.get_running_loop()
+        while True:
+            start = event_loop.time()
+            await asyncio.sleep(self._interval)
+            lag = max(event_loop.time() - start - self._interval, 0.0)
+            self.samples += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+
+    def __str__(self):
+        return (f'Event Loop Lag: {self.average_lag * 1000:.1f} ms average, {self.max_lag * 1000:.1f} ms max '
+                f'over {self.samples} samples')
+
+
+class PipelineMonitor:
+    submitted: int
+    failed: int
+    verdicts: int
+    total_verdict_latency: float
+    max_verdict_latency: float
+    _started: float
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.submitted = 0
+        self.failed = 0
+        self.verdicts = 0
+        self.total_verdict_latency = 0.0
+        self.max_verdict_latency = 0.0
+        self._started = monotonic()
+
+    def record_submission(self, succeeded: bool):
+        if succeeded:
+            self.submitted += 1
+        else:
+            self.failed += 1
+
+    def record_verdict(self, latency: float):
+        self.verdicts += 1
+        self.total_verdict_latency += latency
+        self.max_verdict_latency = max(self.max_verdict_latency, latency)
+
+    @property
+    def throughput(self):
+        return self.submitted * 60 / elapsed if (elapsed := monotonic() - self._started) > 0 else 0.0
+
+    @property
+    def average_verdict_latency(self):
+        return self.total_verdict_latency / self.verdicts if self.verdicts else 0.0
+
+    def __str__(self):
+        return (f'Submission Throughput: {self.throughput:.1f} per minute ({self.submitted} submitted, '
+                f'{self.failed} failed); Verdict Latency: {self.average_verdict_latency:.1f} s average, '
+                f'{self.max_verdict_latency:.1f} s max over {self.verdicts} verdicts')
+
+
+__all__ = ('EventLoopLagMonitor', 'PipelineMonitor')
@@ -0,0 +1,112 @@
+from django.conf import settings
+from pathlib import Path
+from os import getpid
+from uuid import uuid4
+import asyncio
+import socket
+
+MANAGER_CHANNEL = 'manager'
+_notifiers: set['Notifier'] = set()
+
+
+def submissions_channel(account_id: int):
+    return f'submissions:{account_id}'
+
+
+def account_channel(account_id: int):
+    return f'account:{account_id}'
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    _notifier: 'Notifier'
+
+    def __init__(self, notifier: 'Notifier'):
+        self._notifier = notifier
+
+    def datagram_received(self, data: bytes, addr):
+        self._notifier.set(data.decode(errors='replace'))
+
+
+class Notifier:
+    _event_loop: asyncio.AbstractEventLoop | None
+    _events: dict[str, asyncio.Event]
+    _transport: asyncio.DatagramTransport | None
+    path: Path | None
+
+    def __init__(self):
+        self._event_loop = None
+        self._events = dict()
+        self._transport = None
+        self.path = None
+
+    def _event(self, channel: str):
+        if not (event := self._events.get(channel)):
+            event = self._events[channel] = asyncio.Event()
+        return event
+
+    def set(self, channel: str):
+        self._event(channel).set()
+
+    def notify(self, channel: str):
+        try:
+            self._event_loop.call_soon_threadsafe(self.set, channel)
+        except RuntimeError:
+            pass
+
+    async def start(self):
+        self._event_loop = asyncio.get_running_loop()
+        _notifiers.add(self)
+        if not (directory := settings.BOT_NOTIFICATION_DIRECTORY) or not hasattr(socket, 'AF_UNIX'):
+            return
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        self.path = Path(directory) / f'{getpid()}-{uuid4().hex[:8]}.sock'
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(str(self.path))
+        self._transport, _ = await self._event_loop.create_datagram_endpoint(
+            lambda: _DatagramProtocol(self), sock=sock
+        )
+
+    def close(self):
+        _notifiers.discard(self)
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+        if self.path:
+            self.path.unlink(missing_ok=True)
+            self.path = None
+
+    async def wait(self, *channels: str, timeout: float):
+        events = {channel: self._event(channel) for channel in channels}
+        if not any(event.is_set() for event in events.values()):
+            waiters = [asyncio.ensure_future(event.wait()) for event in events.values()]
+            await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for waiter in waiters:
+                waiter.cancel()
+        fired = {channel for channel, event in events.items() if event.is_set()}
+        for channel in fired:
+            events[channel].clear()
+        return fired
+
+
+def publish(*channels: str):
+    for notifier in tuple(_notifiers):
+        for channel in channels:
+            notifier.notify(channel)
+    if not (directory := settings.BOT_NOTIFICATION_DIRECTORY) or not hasattr(socket, 'AF_UNIX'):
+        return
+    local_paths = {notifier.path for notifier in _notifiers}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        sock.setblocking(False)
+        for path in Path(directory).glob('*.sock'):
+            if path in local_paths:
+                continue
+            try:
+                for channel in channels:
+                    sock.sendto(channel.encode(), str(path))
+            except (ConnectionRefusedError, FileNotFoundError):
+                path.unlink(missing_ok=True)
+            except BlockingIOError:
+                pass
+
+
+__all__ = ('MANAGER_CHANNEL', 'submissions_channel', 'account_channel', 'Notifier', 'publish')
@@ -0,0 +1,81 @@
+from django.conf import settings
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from time import monotonic
+import asyncio
+
+
+class TokenBucket:
+    rate: float
+    capacity: float
+    _tokens: float
+    _updated: float
+    _blocked_until: float
+    _lock: asyncio.Lock
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                self._refill(now := monotonic())
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep(max(self._blocked_until - now, (1 - self._tokens) / self.rate))
+
+    def penalize(self, delay: float):
+        self._blocked_until = max(self._blocked_until, monotonic() + delay)
+        self._tokens = 0.0
+        self._updated = self._blocked_until - 1 / self.rate
+
+
+class RateLimiter:
+    API = 'api'
+    PAGE = 'page'
+    SUBMIT = 'submit'
+    _buckets: dict[tuple[str, int | None], TokenBucket]
+
+    def __init__(self):
+        self._buckets = dict()
+
+    def bucket(self, name: str, account_id: int | None = None):
+        limits = settings.BOT_RATE_LIMITS[name]
+        key = name, account_id if limits.get('per_account') else None
+        if not (bucket := self._buckets.get(key)):
+            bucket = self._buckets[key] = TokenBucket(limits['rate'], limits['capacity'])
+        return bucket
+
+    async def acquire(self, names: tuple[str, ...], account_id: int | None = None):
+        for name in names:
+            await self.bucket(name, account_id).acquire()
+
+    def penalize(self, names: tuple[str, ...], delay: float, account_id: int | None = None):
+        for name in names:
+            self.bucket(name, account_id).penalize(delay)
+
+
+def parse_retry_after(value: str | None):
+    if not value:
+        return float(settings.BOT_RATE_LIMIT_BACKOFF)
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return float(settings.BOT_RATE_LIMIT_BACKOFF)
+
+
+__all__ = ('TokenBucket', 'RateLimiter', 'parse_retry_after')
@@ -0,0 +1,153 @@
+from django.conf import settings
+from django.db.models import IntegerChoices
+from aiohttp import ClientConnectionError, ClientConnectorError
+from collections import Counter
+from random import random
+from time import monotonic
+from . import exceptions
+import asyncio
+
+IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+TRANSIENT_STATUSES = frozenset((429, 500, 502, 503, 504))
+REJECTED_STATUSES = frozenset((429, 503))
+
+
+class RetryBudget:
+    ratio: float
+    capacity: float
+    _tokens: float
+
+    def __init__(self, ratio: float, capacity: float):
+        self.ratio = ratio
+        self.capacity = capacity
+        self._tokens = capacity
+
+    def deposit(self):
+        self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def withdraw(self):
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+class RetryPolicy:
+    attempts: int
+    backoff: float
+    max_backoff: float
+    budget: RetryBudget
+
+    def __init__(self):
+        self.attempts = settings.BOT_RETRY_ATTEMPTS
+        self.backoff = settings.BOT_RETRY_BACKOFF
+        self.max_backoff = settings.BOT_RETRY_MAX_BACKOFF
+        self.budget = RetryBudget(**settings.BOT_RETRY_BUDGET)
+
+    @staticmethod
+    def retryable(method: str, outcome: int | BaseException):
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        if isinstance(outcome, int):
+            return outcome in (TRANSIENT_STATUSES if idempotent else REJECTED_STATUSES)
+        if idempotent:
+            return isinstance(outcome, (ClientConnectionError, asyncio.TimeoutError))
+        return isinstance(outcome, ClientConnectorError)
+
+    def retry(self, method: str, attempt: int, outcome: int | BaseException):
+        return attempt < self.attempts and self.retryable(method, outcome) and self.budget.withdraw()
+
+    def delay(self, attempt: int):
+        return random() * min(self.backoff * 2 ** attempt, self.max_backoff)
+
+
+class CircuitBreaker:
+    class State(IntegerChoices):
+        CLOSED = 0, 'Closed'
+        HALF_OPEN = 1, 'Half Open'
+        OPEN = 2, 'Open'
+
+    state: State
+    failures: int
+    reset_timeout: float
+    _retry_at: float
+
+    def __init__(self):
+        self.state = CircuitBreaker.State.CLOSED
+        self.failures = 0
+        self.reset_timeout = settings.BOT_CIRCUIT_BREAKER_RESET_TIMEOUT
+        self._retry_at = 0.0
+
+    @property
+    def retry_after(self):
+        return max(self._retry_at - monotonic(), 0.0)
+
+    def allow(self):
+        if self.state == CircuitBreaker.State.CLOSED:
+            return True
+        if (now := monotonic()) < self._retry_at:
+            return False
+        self.state = CircuitBreaker.State.HALF_OPEN
+        self._retry_at = now + self.reset_timeout
+        return True
+
+    def record_success(self):
+        self.state = CircuitBreaker.State.CLOSED
+        self.failures = 0
+        self.reset_timeout = settings.BOT_CIRCUIT_BREAKER_RESET_TIMEOUT
+
+    def record_failure(self):
+        self.failures += 1
+        match self.state:
+            case CircuitBreaker.State.OPEN:
+                return
+            case CircuitBreaker.State.HALF_OPEN:
+                self.reset_timeout = min(self.reset_timeout * 2, settings.BOT_CIRCUIT_BREAKER_MAX_RESET_TIMEOUT)
+            case CircuitBreaker.State.CLOSED if self.failures < settings.BOT_CIRCUIT_BREAKER_THRESHOLD:
+                return
+        self.state = CircuitBreaker.State.OPEN
+        self._retry_at = monotonic() + self.reset_timeout
+
+
+class CircuitBreakers:
+    _breakers: dict[tuple[int, str | None], CircuitBreaker]
+
+    def __init__(self):
+        self._breakers = dict()
+
+    def breaker(self, account_id: int, endpoint: str | None = None):
+        if not (breaker := self._breakers.get(key := (account_id, endpoint))):
+            breaker = self._breakers[key] = CircuitBreaker()
+        return breaker
+
+    def acquire(self, account_id: int, endpoint: str):
+        for circuit in (None, endpoint):
+            if not (breaker := self.breaker(account_id, circuit)).allow():
+                raise exceptions.CircuitOpen(circuit, breaker.retry_after)
+
+    def record(self, account_id: int, endpoint: str, succeeded: bool):
+        for circuit in (None, endpoint):
+            if succeeded:
+                self.breaker(account_id, circuit).record_success()
+            else:
+                self.breaker(account_id, circuit).record_failure()
+
+    def check(self, account_id: int):
+        if (breaker := self.breaker(account_id)).state == CircuitBreaker.State.OPEN and breaker.retry_after:
+            raise exceptions.CircuitOpen(None, breaker.retry_after)
+
+    def __iter__(self):
+        return iter(self._breakers.items())
+
+    def __str__(self):
+        states = Counter(breaker.state for breaker in self._breakers.values())
+        return (f'Circuit Breakers: {states[CircuitBreaker.State.OPEN]} open, '
+                f'{states[CircuitBreaker.State.HALF_OPEN]} half open, {len(self._breakers)} total')
+
+
+def is_transient(error: BaseException):
+    if isinstance(error, exceptions.PageLoadFailed):
+        return error.status in TRANSIENT_STATUSES
+    return isinstance(error, (exceptions.CircuitOpen, ClientConnectionError, asyncio.TimeoutError))
+
+
+__all__ = ('RetryBudget', 'RetryPolicy', 'CircuitBreaker', 'CircuitBreakers', 'is_transient')
@@ -0,0 +1,146 @@
+from django.conf import settings
+from django.utils.module_loading import import_string
+from common import models
+from abc import ABC, abstractmethod
+from itertools import cycle
+import heapq
+
+
+class AccountLoad:
+    outstanding: int
+    submitted: int
+    failed: int
+    latency: float | None
+    error_rate: float
+
+    def __init__(self):
+        self.outstanding = 0
+        self.submitted = 0
+        self.failed = 0
+        self.latency = None
+        self.error_rate = 0.0
+
+    def record_submission(self, latency: float, succeeded: bool):
+        smoothing = settings.BOT_SCHEDULER_SMOOTHING
+        self.outstanding = max(self.outstanding - 1, 0)
+        if succeeded:
+            self.submitted += 1
+            self.latency = latency if self.latency is None else self.latency + smoothing * (latency - self.latency)
+        else:
+            self.failed += 1
+        self.error_rate += smoothing * ((not succeeded) - self.error_rate)
+
+    def record_skip(self):
+        self.outstanding = max(self.outstanding - 1, 0)
+
+    @property
+    def free_slots(self):
+        if (limit := settings.BOT_SCHEDULER_MAX_OUTSTANDING) is None:
+            return None
+        return max(limit - self.outstanding, 0)
+
+    def cost(self, account: models.BotAccount):
+        latency = settings.BOT_SCHEDULER_DEFAULT_LATENCY if self.latency is None else self.latency
+        cost = latency / max(1 - self.error_rate, settings.BOT_SCHEDULER_MIN_SUCCESS_RATE) / \
+            settings.BOT_SUBMIT_CONCURRENCY
+        return cost if account.is_verified else cost * settings.BOT_SCHEDULER_UNVERIFIED_WEIGHT
+
+    def __str__(self):
+        latency = 'unknown' if self.latency is None else f'{self.latency:.1f} s'
+        return (f'{self.outstanding} outstanding, {latency} latency, {self.error_rate * 100:.0f}% errors '
+                f'({self.submitted} submitted, {self.failed} failed)')
+
+
+class SchedulingPolicy(ABC):
+    @abstractmethod
+    def plan(self, submission_ids: list[int], accounts: list[models.BotAccount],
+             loads: dict[int, AccountLoad]) -> dict[int, list[int]]:
+        pass
+
+
+class RoundRobinPolicy(SchedulingPolicy):
+    def plan(self, submission_ids: list[int], accounts: list[models.BotAccount], loads: dict[int, AccountLoad]):
+        slots = {account.id: loads[account.id].free_slots for account in accounts}
+        plan = {account.id: list() for account in accounts}
+        submission_ids = iter(submission_ids)
+        for account in cycle(sorted(accounts, key=lambda account: account.last_assignment)):
+            if not any(free_slots is None or free_slots > 0 for free_slots in slots.values()):
+                break
+            if slots[account.id] == 0:
+                continue
+            if (submission_id := next(submission_ids, None)) is None:
+                break
+            plan[account.id].append(submission_id)
+            if slots[account.id] is not None:
+                slots[account.id] -= 1
+        return plan
+
+
+class LeastOutstandingWorkPolicy(SchedulingPolicy):
+    def plan(self, submission_ids: list[int], accounts: list[models.BotAccount], loads: dict[int, AccountLoad]):
+        plan = {account.id: list() for account in accounts}
+        heap = list()
+        for account in accounts:
+            load = loads[account.id]
+            if (free_slots := load.free_slots) is not None and load.latency is None:
+                free_slots = min(free_slots, settings.BOT_SUBMIT_CONCURRENCY)
+            elif load.latency is None:
+                free_slots = settings.BOT_SUBMIT_CONCURRENCY
+            if free_slots != 0:
+                heapq.heappush(heap, (
+                    (load.outstanding + 1) * (cost := load.cost(account)), account.last_assignment, account.id, cost,
+                    free_slots
+                ))
+        for submission_id in submission_ids:
+            if not heap:
+                break
+            finish, last_assignment, account_id, cost, free_slots = heapq.heappop(heap)
+            plan[account_id].append(submission_id)
+            if (free_slots is None or (free_slots := free_slots - 1) > 0) and \
+                    finish + cost <= settings.BOT_SCHEDULER_HORIZON:
+                heapq.heappush(heap, (finish + cost, last_assignment, account_id, cost, free_slots))
+        return plan
+
+
+class Scheduler:
+    policy: SchedulingPolicy
+    _loads: dict[int, AccountLoad]
+
+    def __init__(self, policy: SchedulingPolicy | None = None):
+        self.policy = policy or import_string(settings.BOT_SCHEDULING_POLICY)()
+        self._loads = dict()
+
+    def load(self, account_id: int):
+        if not (load := self._loads.get(account_id)):
+            load = self._loads[account_id] = AccountLoad()
+        return load
+
+    def capacity(self, accounts: list[models.BotAccount]):
+        limit = settings.BOT_ASSIGNMENT_LIMIT_PER_ACCOUNT * len(accounts)
+        if settings.BOT_SCHEDULER_MAX_OUTSTANDING is None:
+            return limit
+        return min(limit, sum(self.load(account.id).free_slots for account in accounts))
+
+    def plan(self, submission_ids: list[int], accounts: list[models.BotAccount]):
+        plan = self.policy.plan(submission_ids, accounts, {account.id: self.load(account.id) for account in accounts})
+        return {account_id: submission_ids for account_id, submission_ids in plan.items() if submission_ids}
+
+    def assigned(self, plan: dict[int, list[int]]):
+        for account_id, submission_ids in plan.items():
+            self.load(account_id).outstanding += len(submission_ids)
+
+    def record_submission(self, account_id: int, latency: float, succeeded: bool):
+        self.load(account_id).record_submission(latency, succeeded)
+
+    def record_skip(self, account_id: int):
+        self.load(account_id).record_skip()
+
+    def forget(self, account_id: int):
+        self._loads.pop(account_id, None)
+
+    def __str__(self):
+        return 'Scheduler: ' + ('; '.join(f'"{account_id}" {load}' for account_id, load in self._loads.items())
+                                or 'idle')
+
+
+__all__ = ('AccountLoad', 'SchedulingPolicy', 'RoundRobinPolicy', 'LeastOutstandingWorkPolicy', 'Scheduler')
@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import Storage
+from django.db.models.fields.files import FieldFile
+from common import storages
+from asgiref.sync import sync_to_async
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import cache
+from io import BytesIO
+from pathlib import Path
+
+
+class SourceCache:
+    max_size: int
+    size: int
+    _sources: OrderedDict[str, bytes]
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.size = 0
+        self._sources = OrderedDict()
+
+    def get(self, name: str):
+        if (source := self._sources.get(name)) is not None:
+            self._sources.move_to_end(name)
+        return source
+
+    def put(self, name: str, source: bytes):
+        if len(source) > self.max_size or name in self._sources:
+            return
+        self._sources[name] = source
+        self.size += len(source)
+        while self.size > self.max_size:
+            self.size -= len(self._sources.popitem(last=False)[1])
+
+
+class SourceBuffer(BytesIO):
+    def close(self):
+        pass
+
+    def release(self):
+        super().close()
+
+
+@cache
+def get_source_cache():
+    return SourceCache(settings.BOT_SOURCE_CACHE_SIZE)
+
+
+def _load(storage: Storage, name: str) -> bytes | File:
+    if storage.size(name) > settings.BOT_SOURCE_STREAM_THRESHOLD:
+        return storage.open(name, 'rb')
+    with storage.open(name, 'rb') as file:
+        return file.read()
+
+
+@asynccontextmanager
+async def open_source(file: FieldFile):
+    if (source := get_source_cache().get(file.name)) is None:
+        if not isinstance(source := await sync_to_async(_load, thread_sensitive=False)(file.storage, file.name), bytes):
+            try:
+                yield source.file
+            finally:
+                await sync_to_async(source.close, thread_sensitive=False)()
+            return
+        get_source_cache().put(file.name, source)
+    buffer = SourceBuffer(source)
+    buffer.name = Path(storages.strip_compression(file.name)).name
+    try:
+        yield buffer
+    finally:
+        buffer.release()
+
+
+__all__ = ('SourceCache', 'SourceBuffer', 'get_source_cache', 'open_source')
@@ -0,0 +1,78 @@
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, AsyncResolver, CookieJar, TraceConfig
+from django.conf import settings
+
+
+class Transport:
+    _connector: TCPConnector | None
+    _trace_config: TraceConfig
+    created_connections: int
+    reused_connections: int
+    queued_connections: int
+    dns_cache_hits: int
+    dns_cache_misses: int
+
+    def __init__(self):
+        self._connector = None
+        self._trace_config = TraceConfig()
+        self._trace_config.on_connection_create_end.append(self._on_connection_created)
+        self._trace_config.on_connection_reuseconn.append(self._on_connection_reused)
+        self._trace_config.on_connection_queued_start.append(self._on_connection_queued)
+        self._trace_config.on_dns_cache_hit.append(self._on_dns_cache_hit)
+        self._trace_config.on_dns_cache_miss.append(self._on_dns_cache_miss)
+        self.created_connections = 0
+        self.reused_connections = 0
+        self.queued_connections = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+
+    async def __aenter__(self):
+        self._connector = TCPConnector(
+            limit=settings.BOT_CONNECTION_LIMIT,
+            limit_per_host=settings.BOT_CONNECTION_LIMIT_PER_HOST,
+            ttl_dns_cache=settings.BOT_DNS_CACHE_TTL,
+            keepalive_timeout=settings.BOT_KEEPALIVE_TIMEOUT,
+            resolver=AsyncResolver()
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._connector.close()
+        self._connector = None
+
+    async def _on_connection_created(self, session, context, params):
+        self.created_connections += 1
+
+    async def _on_connection_reused(self, session, context, params):
+        self.reused_connections += 1
+
+    async def _on_connection_queued(self, session, context, params):
+        self.queued_connections += 1
+
+    async def _on_dns_cache_hit(self, session, context, params):
+        self.dns_cache_hits += 1
+
+    async def _on_dns_cache_miss(self, session, context, params):
+        self.dns_cache_misses += 1
+
+    @property
+    def reuse_ratio(self):
+        if total := self.created_connections + self.reused_connections:
+            return self.reused_connections / total
+        return 0.0
+
+    def create_session(self):
+        return ClientSession(
+            connector=self._connector,
+            connector_owner=False,
+            cookie_jar=CookieJar(),
+            timeout=ClientTimeout(total=settings.BOT_REQUEST_TIMEOUT),
+            trace_configs=(self._trace_config,)
+        )
+
+    def __str__(self):
+        return (f'Connections: {self.created_connections} created, {self.reused_connections} reused '
+                f'({self.reuse_ratio:.0%}), {self.queued_connections} queued; '
+                f'DNS Cache: {self.dns_cache_hits} hits, {self.dns_cache_misses} misses')
+
+
+__all__ = ('Transport',)
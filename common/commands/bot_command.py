@@ -1,15 +1,20 @@
 from django.core.management.base import BaseCommand
+from common.bot import logs
 from abc import ABC, abstractmethod
 import asyncio
 
 
 class BotCommand(ABC, BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('--log-format', choices=('text', 'json'))
+
     @abstractmethod
     async def run_manager(self):
         pass
 
     def handle(self, *args, **options):
-        asyncio.run(self.run_manager())
+        with logs.start_logging(self.stdout, options['log_format']):
+            asyncio.run(self.run_manager())
 
 
 __all__ = ('BotCommand',)
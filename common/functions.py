@@ -1,5 +1,8 @@
 from uuid import uuid4
 from pathlib import Path
+from hashlib import sha256
+
+CODE_SUBMISSION_DIRECTORY = 'code-submissions/'
 
 
 def generate_name(prefix, filename: str):
@@ -7,7 +10,14 @@ def generate_name(prefix, filename: str):
 
 
 def code_submission_file_name(instance, filename: str):
-    return generate_name('code-submissions/', filename)
+    return generate_name(CODE_SUBMISSION_DIRECTORY, filename)
+
+
+def hash_source(file):
+    digest = sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
 
 
-__all__ = ('generate_name', 'code_submission_file_name')
+__all__ = ('CODE_SUBMISSION_DIRECTORY', 'generate_name', 'code_submission_file_name', 'hash_source')
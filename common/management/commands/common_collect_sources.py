@@ -0,0 +1,46 @@
+from django.core.management import BaseCommand
+from common import models, functions
+from pathlib import Path
+from time import time
+
+
+class Command(BaseCommand):
+    help = 'Deletes code submission files that no submission references anymore.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=3600, help='Keep files modified within this many seconds.')
+        parser.add_argument('--dry-run', action='store_true')
+
+    @staticmethod
+    def _is_referenced(name: str):
+        return models.CodeSubmission.objects.filter(file=name).exists()
+
+    def handle(self, *args, grace: int, dry_run: bool, **options):
+        storage = models.CodeSubmission._meta.get_field('file').storage
+        if not (directory := Path(storage.path(functions.CODE_SUBMISSION_DIRECTORY))).is_dir():
+            return
+        referenced_names = set(models.CodeSubmission.objects.values_list('file', flat=True).iterator())
+        cutoff = time() - grace
+        deleted_count = deleted_size = kept_count = 0
+        for path in directory.rglob('*'):
+            if not path.is_file():
+                continue
+            name = path.relative_to(storage.location).as_posix()
+            if name in referenced_names or self._is_referenced(name) or path.stat().st_mtime > cutoff:
+                kept_count += 1
+                continue
+            deleted_count += 1
+            deleted_size += path.stat().st_size
+            if not dry_run:
+                path.unlink(missing_ok=True)
+        if not dry_run:
+            for path in sorted(directory.rglob('*'), key=lambda path: len(path.parts), reverse=True):
+                if path.is_dir() and not any(path.iterdir()):
+                    path.rmdir()
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Would delete" if dry_run else "Deleted"} {deleted_count} files ({deleted_size // 1024} KiB), '
+            f'kept {kept_count}.'
+        ))
+
+
+__all__ = ('Command',)
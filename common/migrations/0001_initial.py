@@ -0,0 +1,56 @@
+# Generated by Django 5.0.4 on 2026-10-17 07:57
+
+import common.fields
+import common.functions
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BotAccount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('handle', common.fields.ICharField(max_length=64, unique=True)),
+                ('clear_password', models.CharField(max_length=32, validators=[django.core.validators.MinLengthValidator(5)])),
+                ('email', common.fields.IEmailField(max_length=254, unique=True)),
+                ('is_verified', models.BooleanField(default=False)),
+                ('last_assignment', models.DateTimeField(default=django.utils.timezone.now)),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'Active'), (2, 'Authentication Failed'), (3, 'Inactive')], default=1)),
+            ],
+            options={
+                'ordering': ('-id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='CodeSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(upload_to=common.functions.code_submission_file_name)),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'Pending'), (2, 'In Progress'), (3, 'Failed'), (4, 'Submitted'), (5, 'Result Not Found')], default=1)),
+                ('creation_datetime', models.DateTimeField(auto_now_add=True)),
+                ('submission_id', models.BigIntegerField(blank=True, null=True, unique=True)),
+                ('bot_account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='common.botaccount')),
+            ],
+            options={
+                'ordering': ('-id',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='codesubmission',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('status', 4), ('submission_id__isnull', False)), models.Q(models.Q(('status', 4), _negated=True), ('submission_id__isnull', True)), _connector='OR'), name='valid_submitted_code'),
+        ),
+        migrations.AddConstraint(
+            model_name='codesubmission',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(models.Q(('status', 1), _negated=True), ('bot_account__isnull', False)), models.Q(('bot_account__isnull', True), ('status', 1)), _connector='OR'), name='valid_assigned_code'),
+        ),
+    ]
@@ -0,0 +1,120 @@
+# Generated by Django 5.0.4 on 2026-10-17 07:57
+
+import common.functions
+import common.storages
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BotSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cookies', models.JSONField(default=list)),
+                ('logout_url', models.CharField(blank=True, max_length=256, null=True)),
+                ('update_datetime', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ('-id',),
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name='codesubmission',
+            name='valid_submitted_code',
+        ),
+        migrations.AddField(
+            model_name='botaccount',
+            name='heartbeat',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='botaccount',
+            name='lease_expiry',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='botaccount',
+            name='owner',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='codesubmission',
+            name='heartbeat',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='codesubmission',
+            name='lease_expiry',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='codesubmission',
+            name='original',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='common.codesubmission'),
+        ),
+        migrations.AddField(
+            model_name='codesubmission',
+            name='owner',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='codesubmission',
+            name='source_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='codesubmission',
+            name='submission_datetime',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='codesubmission',
+            name='file',
+            field=models.FileField(storage=common.storages.get_code_submission_storage, upload_to=common.functions.code_submission_file_name),
+        ),
+        migrations.AlterField(
+            model_name='codesubmission',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'Pending'), (2, 'In Progress'), (3, 'Failed'), (4, 'Submitted'), (5, 'Result Not Found'), (6, 'Duplicate')], default=1),
+        ),
+        migrations.AddIndex(
+            model_name='botaccount',
+            index=models.Index(fields=['status', 'owner'], name='bot_account_status'),
+        ),
+        migrations.AddIndex(
+            model_name='codesubmission',
+            index=models.Index(fields=['bot_account', 'status'], name='code_submission_account_status'),
+        ),
+        migrations.AddIndex(
+            model_name='codesubmission',
+            index=models.Index(condition=models.Q(('status', 1)), fields=['id'], name='code_submission_pending'),
+        ),
+        migrations.AddIndex(
+            model_name='codesubmission',
+            index=models.Index(condition=models.Q(('status', 2)), fields=['lease_expiry'], name='code_submission_in_progress'),
+        ),
+        migrations.AddIndex(
+            model_name='codesubmission',
+            index=models.Index(fields=['source_hash', 'bot_account'], name='code_submission_source'),
+        ),
+        migrations.AddConstraint(
+            model_name='codesubmission',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('status__in', (4, 5)), ('submission_id__isnull', False)), models.Q(models.Q(('status__in', (4, 5)), _negated=True), ('submission_id__isnull', True)), _connector='OR'), name='valid_submitted_code'),
+        ),
+        migrations.AddConstraint(
+            model_name='codesubmission',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('original__isnull', False), ('status', 6)), models.Q(('status', 6), _negated=True), _connector='OR'), name='valid_duplicate_code'),
+        ),
+        migrations.AddField(
+            model_name='botsession',
+            name='bot_account',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='session', to='common.botaccount'),
+        ),
+    ]
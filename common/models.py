@@ -1,10 +1,19 @@
 from django.db import models
-from . import fields, functions
+from . import fields, functions, storages
 from django.core.validators import MinLengthValidator
 from django.utils import timezone
 
 
-class BotAccount(models.Model):
+class LeasedModel(models.Model):
+    owner = models.CharField(max_length=255, blank=True, null=True)
+    lease_expiry = models.DateTimeField(blank=True, null=True)
+    heartbeat = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        abstract = True
+
+
+class BotAccount(LeasedModel):
     class Status(models.IntegerChoices):
         ACTIVE = 1, 'Active'
         AUTHENTICATION_FAILED = 2, 'Authentication Failed'
@@ -19,34 +28,65 @@ class BotAccount(models.Model):
 
     class Meta:
         ordering = ('-id',)
+        indexes = (models.Index(fields=('status', 'owner'), name='bot_account_status'),)
 
     def __str__(self):
         return f'{self.email} : {self.handle}'
 
 
-class CodeSubmission(models.Model):
+class BotSession(models.Model):
+    bot_account = models.OneToOneField(BotAccount, models.CASCADE, related_name='session')
+    cookies = models.JSONField(default=list)
+    logout_url = models.CharField(max_length=256, blank=True, null=True)
+    update_datetime = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ('-id',)
+
+    def __str__(self):
+        return f'{self.bot_account} : {self.update_datetime}'
+
+
+class CodeSubmission(LeasedModel):
     class Status(models.IntegerChoices):
         PENDING = 1, 'Pending'
         IN_PROGRESS = 2, 'In Progress'
         FAILED = 3, 'Failed'
         SUBMITTED = 4, 'Submitted'
         RESULT_NOT_FOUND = 5, 'Result Not Found'
+        DUPLICATE = 6, 'Duplicate'
 
     bot_account = models.ForeignKey(BotAccount, models.CASCADE, 'submissions', blank=True, null=True)
-    file = models.FileField(upload_to=functions.code_submission_file_name)
+    file = models.FileField(upload_to=functions.code_submission_file_name, storage=storages.get_code_submission_storage)
     status = models.PositiveSmallIntegerField(choices=Status.choices, default=Status.PENDING)
     creation_datetime = models.DateTimeField(auto_now_add=True)
+    submission_datetime = models.DateTimeField(blank=True, null=True)
     submission_id = models.BigIntegerField(unique=True, blank=True, null=True)
+    source_hash = models.CharField(max_length=64, blank=True, null=True)
+    original = models.ForeignKey('self', models.SET_NULL, 'duplicates', blank=True, null=True)
 
     class Meta:
         ordering = ('-id',)
+        indexes = (
+            models.Index(fields=('bot_account', 'status'), name='code_submission_account_status'),
+            models.Index(fields=('id',), name='code_submission_pending', condition=models.Q(status=1)),
+            models.Index(fields=('lease_expiry',), name='code_submission_in_progress', condition=models.Q(status=2)),
+            models.Index(fields=('source_hash', 'bot_account'), name='code_submission_source')
+        )
         constraints = (models.CheckConstraint(
-            check=models.Q(status=4, submission_id__isnull=False) | (
-                ~models.Q(status=4) & models.Q(submission_id__isnull=True)
+            check=models.Q(status__in=(4, 5), submission_id__isnull=False) | (
+                ~models.Q(status__in=(4, 5)) & models.Q(submission_id__isnull=True)
             ),
             name='valid_submitted_code'
         ), models.CheckConstraint(check=(~models.Q(status=1) & models.Q(bot_account__isnull=False)) |
-                                  models.Q(status=1, bot_account__isnull=True), name='valid_assigned_code'))
+                                  models.Q(status=1, bot_account__isnull=True), name='valid_assigned_code'),
+            models.CheckConstraint(check=models.Q(status=6, original__isnull=False) | ~models.Q(status=6),
+                                   name='valid_duplicate_code'))
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.file and not self.source_hash:
+            self.source_hash = functions.hash_source(self.file)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f'{self.bot_account} : {self.id}'
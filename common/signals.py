@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save
+from django.conf import settings
+from django.dispatch import receiver
+from .bot import notifications
+from . import models
+
+
+@receiver(post_save)
+def notify_bots(sender, instance, created: bool, raw: bool = False, **kwargs):
+    if raw:
+        return
+    if isinstance(instance, models.CodeSubmission) and created:
+        transaction.on_commit(lambda: notifications.publish(notifications.MANAGER_CHANNEL))
+    elif isinstance(instance, models.BotAccount):
+        transaction.on_commit(lambda: notifications.publish(
+            notifications.MANAGER_CHANNEL, notifications.account_channel(instance.id)
+        ))
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not settings.SQLITE_JOURNAL_MODE:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}')
+        cursor.execute('PRAGMA synchronous = NORMAL')
+
+
+__all__ = ('notify_bots', 'configure_sqlite')
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from hashlib import sha256
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+import gzip
+import lzma
+import os
+
+COMPRESSIONS = {'gzip': ('.gz', gzip.compress, gzip.open), 'lzma': ('.xz', lzma.compress, lzma.open)}
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    compression: str | None
+
+    def __init__(self, compression: str | None = None, **kwargs):
+        super().__init__(**kwargs)
+        self.compression = compression
+
+    def _candidate_names(self, name: str):
+        yield name
+        for extension, _, _ in COMPRESSIONS.values():
+            yield name + extension
+
+    def _save(self, name: str, content: File):
+        source = b''.join(content.chunks())
+        digest = sha256(source).hexdigest()
+        name = str(Path(name).parent / digest[:2] / digest[2:4] / f'{digest}{Path(name).suffix}')
+        for candidate in self._candidate_names(name):
+            try:
+                os.utime(self.path(candidate))
+            except FileNotFoundError:
+                continue
+            return candidate
+        if self.compression:
+            extension, compress, _ = COMPRESSIONS[self.compression]
+            name, source = name + extension, compress(source)
+        Path(path := self.path(name)).parent.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile(dir=Path(path).parent, delete=False) as file:
+            file.write(source)
+        if self.file_permissions_mode is not None:
+            os.chmod(file.name, self.file_permissions_mode)
+        os.replace(file.name, path)
+        return name
+
+    def _open(self, name: str, mode: str = 'rb'):
+        for extension, _, open_compressed in COMPRESSIONS.values():
+            if name.endswith(extension):
+                return File(open_compressed(self.path(name), mode), name)
+        return super()._open(name, mode)
+
+
+def strip_compression(name: str):
+    for extension, _, _ in COMPRESSIONS.values():
+        if name.endswith(extension):
+            return name.removesuffix(extension)
+    return name
+
+
+def get_code_submission_storage():
+    return ContentAddressedStorage(settings.CODE_SUBMISSION_COMPRESSION)
+
+
+__all__ = ('ContentAddressedStorage', 'strip_compression', 'get_code_submission_storage')
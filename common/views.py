@@ -1,3 +1,22 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+from secrets import compare_digest
+from .bot import metrics
 
-# Create your views here.
+
+def _has_metrics_token(request):
+    authorization = request.headers.get('Authorization', '')
+    return bool(settings.BOT_METRICS_TOKEN) and compare_digest(
+        authorization.encode(), f'Bearer {settings.BOT_METRICS_TOKEN}'.encode()
+    )
+
+
+def bot_metrics(request):
+    if not settings.BOT_METRICS_ENABLED:
+        raise Http404
+    if not (request.user.is_staff or _has_metrics_token(request)):
+        raise PermissionDenied
+    return HttpResponse(
+        metrics.collect_snapshots().render(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -11,6 +11,8 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 from pathlib import Path
+from tempfile import gettempdir
+from os import environ
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -75,12 +77,31 @@ WSGI_APPLICATION = 'web_services.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
+match environ.get('DATABASE_ENGINE', 'sqlite'):
+    case 'postgresql':
+        DATABASES = {
+            'default': {
+                'ENGINE': 'django.db.backends.postgresql',
+                'NAME': environ.get('DATABASE_NAME', 'web_services'),
+                'USER': environ.get('DATABASE_USER', 'postgres'),
+                'PASSWORD': environ.get('DATABASE_PASSWORD', ''),
+                'HOST': environ.get('DATABASE_HOST', 'localhost'),
+                'PORT': environ.get('DATABASE_PORT', '5432'),
+                'CONN_MAX_AGE': int(environ.get('DATABASE_CONN_MAX_AGE', 600)),
+                'CONN_HEALTH_CHECKS': True,
+                'DISABLE_SERVER_SIDE_CURSORS': environ.get('DATABASE_DISABLE_SERVER_SIDE_CURSORS') == '1',
+                'OPTIONS': {'connect_timeout': int(environ.get('DATABASE_CONNECT_TIMEOUT', 10))}
+            }
+        }
+    case _:
+        DATABASES = {
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': environ.get('DATABASE_NAME', BASE_DIR / 'db.sqlite3'),
+                'OPTIONS': {'timeout': int(environ.get('DATABASE_TIMEOUT', 20))}
+            }
+        }
+SQLITE_JOURNAL_MODE = environ.get('SQLITE_JOURNAL_MODE', 'WAL')
 
 
 # Password validation
@@ -125,7 +146,71 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_URL = '/media/'
+CODE_SUBMISSION_COMPRESSION = environ.get('CODE_SUBMISSION_COMPRESSION') or None
 
 # Limits
+CODEFORCES_BASE_URL = environ.get('CODEFORCES_BASE_URL', 'https://codeforces.com')
 CODEFORCES_SEARCH_COUNT = 15
-CODEFORCES_SEARCH_RETRY_COUNT = 2
+CODEFORCES_SEARCH_MAX_COUNT = 100
+CODEFORCES_SEARCH_PAGE_LIMIT = 5
+CODEFORCES_CSRF_TOKEN_TTL = 600
+BOT_ASSIGNMENT_BATCH_SIZE = 1000
+BOT_ASSIGNMENT_LIMIT_PER_ACCOUNT = 100
+BOT_ACCOUNTS_PER_MANAGER = None
+BOT_LEASE_DURATION = 60
+BOT_CONNECTION_LIMIT = 100
+BOT_CONNECTION_LIMIT_PER_HOST = 50
+BOT_DNS_CACHE_TTL = 300
+BOT_KEEPALIVE_TIMEOUT = 30
+BOT_REPORT_INTERVAL = 60
+BOT_HTML_EXTRACTOR = 'common.bot.extractors.PatternExtractor'
+BOT_EXTRACTION_EXECUTOR = None
+BOT_EXTRACTION_WORKERS = 2
+BOT_POLL_INTERVAL = 30
+BOT_RESULT_POLL_INTERVAL = 5
+BOT_RESULT_POLL_MAX_INTERVAL = 60
+BOT_RESULT_POLL_BACKOFF = 0.25
+BOT_RESULT_WINDOW = 900
+BOT_RESULT_SWEEP_INTERVAL = 300
+BOT_RESULT_SWEEP_WINDOW = 86400
+BOT_ACCOUNT_CHECK_INTERVAL = 30
+BOT_NOTIFICATION_DIRECTORY = Path(gettempdir()) / 'web_services'
+BOT_RATE_LIMITS = {
+    'api': {'rate': 0.5, 'capacity': 1},
+    'page': {'rate': 4, 'capacity': 8},
+    'submit': {'rate': 1, 'capacity': 1, 'per_account': True}
+}
+BOT_REQUEST_TIMEOUT = 30
+BOT_RETRY_ATTEMPTS = 3
+BOT_RETRY_BACKOFF = 0.5
+BOT_RETRY_MAX_BACKOFF = 10
+BOT_RETRY_BUDGET = {'ratio': 0.2, 'capacity': 10}
+BOT_CIRCUIT_BREAKER_THRESHOLD = 5
+BOT_CIRCUIT_BREAKER_RESET_TIMEOUT = 30
+BOT_CIRCUIT_BREAKER_MAX_RESET_TIMEOUT = 600
+BOT_RATE_LIMIT_BACKOFF = 10
+BOT_SUBMIT_CONCURRENCY = 2
+BOT_SUBMIT_QUEUE_SIZE = 10
+BOT_SHUTDOWN_TIMEOUT = 30
+BOT_LOGOUT_ON_SHUTDOWN = False
+BOT_LOGOUT_TIMEOUT = 10
+BOT_RESTART_BACKOFF = 5
+BOT_RESTART_MAX_BACKOFF = 300
+BOT_SOURCE_CACHE_SIZE = 16 * 1024 * 1024
+BOT_SOURCE_STREAM_THRESHOLD = 1024 * 1024
+BOT_LOG_FORMAT = environ.get('BOT_LOG_FORMAT', 'text')
+BOT_LOG_LEVEL = environ.get('BOT_LOG_LEVEL', 'INFO')
+BOT_LOG_QUEUE_SIZE = 10000
+BOT_LOG_SAMPLING = {'results': 10}
+BOT_METRICS_ENABLED = environ.get('BOT_METRICS_ENABLED', '1') == '1'
+BOT_METRICS_TOKEN = environ.get('BOT_METRICS_TOKEN') or None
+BOT_METRICS_DIRECTORY = Path(gettempdir()) / 'web_services-metrics'
+BOT_METRICS_INTERVAL = 15
+BOT_METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BOT_SCHEDULING_POLICY = 'common.bot.scheduling.LeastOutstandingWorkPolicy'
+BOT_SCHEDULER_MAX_OUTSTANDING = 50
+BOT_SCHEDULER_HORIZON = 120
+BOT_SCHEDULER_DEFAULT_LATENCY = 5
+BOT_SCHEDULER_SMOOTHING = 0.2
+BOT_SCHEDULER_MIN_SUCCESS_RATE = 0.1
+BOT_SCHEDULER_UNVERIFIED_WEIGHT = 2
@@ -16,7 +16,9 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path
+from common import views as common_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics/', common_views.bot_metrics, name='bot-metrics'),
 ]